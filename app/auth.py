@@ -0,0 +1,251 @@
+from collections import namedtuple
+from datetime import timedelta
+from functools import wraps
+from threading import Lock
+from uuid import uuid4
+import hashlib
+import time
+
+from flask import request, abort, g
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import event
+
+from app.routing import primary
+
+# Who a key belongs to: role is 'user' or 'admin', id is the users.id or api_keys.id
+Principal = namedtuple('Principal', ['role', 'id'])
+
+
+class KeyIndex(object):
+    # In-process map of hashed API key -> Principal.
+    # Entries expire after API_KEY_CACHE_TTL seconds so that changes made by
+    # other gunicorn workers are picked up; changes made by this worker clear
+    # the map right away (see watch()).
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('API_KEY_CACHE_TTL', self.ttl)
+
+    def watch(self, *models):
+        # Any insert, update or delete on these models drops the whole index
+        for model in models:
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                if not event.contains(model, name, self._on_change):
+                    event.listen(model, name, self._on_change)
+
+    def lookup(self, key):
+        if not key:
+            return None
+
+        digest = _digest(key)
+        entry = self._entries.get(digest)
+        now = time.time()
+
+        if entry is not None and entry[1] > now:
+            return entry[0]
+
+        principal = self._load(key)
+        with self._lock:
+            if principal is None:
+                self._entries.pop(digest, None)
+            else:
+                self._entries[digest] = (principal, now + self.ttl)
+        return principal
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load(self, key):
+        # Prevents circular imports
+        from app.models import User, ApiKey
+
+        # Both columns are unique, so each lookup is a single indexed row read.
+        # A key created a moment ago may not have reached the replica yet.
+        with primary():
+            admin_id = ApiKey.query.with_entities(ApiKey.id).filter_by(key=key).scalar()
+            if admin_id is not None:
+                return Principal('admin', admin_id)
+
+            user_id = User.query.with_entities(User.id).filter_by(api_key=key).scalar()
+            if user_id is not None:
+                return Principal('user', user_id)
+
+        return None
+
+    def _on_change(self, mapper, connection, target):
+        self.invalidate()
+
+
+class RevocationList(object):
+    # Ids (jti) of revoked access tokens that have not expired yet.
+    # The set is reloaded from the revoked_tokens table at most once every
+    # TOKEN_REVOCATION_TTL seconds, so checking a token normally costs no query.
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._jtis = frozenset()
+        self._expires = 0
+
+    def __contains__(self, jti):
+        if self._expires <= time.time():
+            self._reload()
+        return jti in self._jtis
+
+    def add(self, jti, expires_at):
+        # Prevents circular imports
+        from app.models import RevokedToken
+
+        if jti not in self:
+            RevokedToken(jti=jti, expires_at=expires_at).save()
+        self._jtis = self._jtis | {jti}
+
+    def _reload(self):
+        # Prevents circular imports
+        from app.models import RevokedToken
+
+        # A revocation must take effect at once, so never from the replica
+        with primary():
+            self._jtis = frozenset(token.jti for token in RevokedToken.get_active())
+        self._expires = time.time() + self.ttl
+
+
+class TokenSigner(object):
+    # Issues and verifies HMAC-signed, expiring access tokens carrying the
+    # principal. The first key in TOKEN_SECRET_KEYS signs new tokens and every
+    # key is accepted when verifying, so keys can be rotated by prepending a
+    # new one and dropping the oldest once TOKEN_MAX_AGE has passed.
+
+    salt = 'access-token'
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self.revoked = RevocationList()
+        self._serializers = []
+
+    def init_app(self, app):
+        self.max_age = app.config.get('TOKEN_MAX_AGE', self.max_age)
+        self.revoked.ttl = app.config.get('TOKEN_REVOCATION_TTL', self.revoked.ttl)
+
+        keys = app.config.get('TOKEN_SECRET_KEYS') or [app.config.get('SECRET_KEY') or app.config.get('SECRET')]
+        self._serializers = [URLSafeTimedSerializer(key, salt=self.salt) for key in keys if key]
+
+    @property
+    def enabled(self):
+        return bool(self._serializers)
+
+    def issue(self, principal):
+        return self._serializers[0].dumps({
+            'sub': principal.id,
+            'role': principal.role,
+            'jti': uuid4().hex
+        })
+
+    def verify(self, token):
+        claims = self.claims(token)
+        if claims is None or claims['jti'] in self.revoked:
+            return None
+        return Principal(claims['role'], claims['sub'])
+
+    def revoke(self, token):
+        claims = self.claims(token, check_expiry=False)
+        if claims is None:
+            return None
+        self.revoked.add(claims['jti'], claims['expires_at'])
+        return claims
+
+    def claims(self, token, check_expiry=True):
+        # Returns the payload plus its expiry, or None if the token is forged or expired
+        max_age = self.max_age if check_expiry else None
+
+        for serializer in self._serializers:
+            try:
+                payload, signed_at = serializer.loads(token, max_age=max_age, return_timestamp=True)
+            except SignatureExpired:
+                return None
+            except BadSignature:
+                continue
+            payload['expires_at'] = signed_at + timedelta(seconds=self.max_age)
+            return payload
+        return None
+
+
+class StreamTokenSigner(TokenSigner):
+    # Tokens for GET /api/v1/stream/?token=. EventSource cannot send headers,
+    # and whatever is in the URL ends up in access logs, so these expire after
+    # STREAM_TOKEN_MAX_AGE seconds and open a stream and nothing else: they
+    # are signed under another salt, so authenticate() does not accept them.
+
+    salt = 'stream-token'
+
+    def __init__(self, max_age=60):
+        super(StreamTokenSigner, self).__init__(max_age)
+        self.default_max_age = max_age
+
+    def init_app(self, app):
+        super(StreamTokenSigner, self).init_app(app)
+        self.max_age = app.config.get('STREAM_TOKEN_MAX_AGE', self.default_max_age)
+
+    def verify(self, token):
+        # Expired long before a revocation would matter
+        claims = self.claims(token)
+        if claims is None:
+            return None
+        return Principal(claims['role'], claims['sub'])
+
+
+def authenticate(request):
+    # A bearer token is verified without touching the database; anything else
+    # goes through the API key index
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer ') and token_signer.enabled:
+        return token_signer.verify(header[len('Bearer '):])
+    return key_index.lookup(request.headers.get('X-Api-Key'))
+
+
+def require_api_key(view_function):
+    @wraps(view_function)
+    def decorated_function(*args, **kwargs):
+        principal = authenticate(request)
+        if principal is None:
+            abort(401)
+        g.principal = principal
+        return view_function(*args, **kwargs)
+    return decorated_function
+
+
+def require_admin_key(view_function):
+    @wraps(view_function)
+    def decorated_function(*args, **kwargs):
+        principal = authenticate(request)
+        if principal is None or principal.role != 'admin':
+            abort(401)
+        g.principal = principal
+        return view_function(*args, **kwargs)
+    return decorated_function
+
+
+def require_key_header(view_function):
+    # Only an X-Api-Key header, not a bearer token: a token that could be
+    # traded for a new one would never really expire
+    @wraps(view_function)
+    def decorated_function(*args, **kwargs):
+        principal = key_index.lookup(request.headers.get('X-Api-Key'))
+        if principal is None:
+            abort(401)
+        g.principal = principal
+        return view_function(*args, **kwargs)
+    return decorated_function
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode('utf-8')).digest()
+
+
+key_index = KeyIndex()
+token_signer = TokenSigner()
+stream_signer = StreamTokenSigner()
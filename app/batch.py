@@ -0,0 +1,125 @@
+from sqlalchemy import and_, or_, select
+from six import integer_types
+
+from app import db
+from app.counters import counters
+from app.models import Tombstone
+from app.upsert import upsert_many
+
+
+def apply_batch(model, items, key_columns, value_columns=()):
+    # Applies a list of operations on `model` in one transaction and returns
+    # one result per item, in order. Each item is a dict holding the key
+    # columns, plus the value columns when adding, and an optional "op":
+    #
+    #   "add"     insert the row, or update its value columns if it exists
+    #   "remove"  delete the row
+    #
+    # Several items for the same key are collapsed into the last one; the
+    # earlier ones are reported as 409. The caller commits.
+    results = [None] * len(items)
+    pending = {}
+
+    for index, item in enumerate(items):
+        error = _validate(item, key_columns, value_columns)
+        if error:
+            results[index] = {'index': index, 'status': 400, 'error': error}
+            continue
+
+        key = tuple(item[column] for column in key_columns)
+        if key in pending:
+            superseded = pending[key][0]
+            results[superseded] = {'index': superseded, 'status': 409,
+                                   'error': 'Superseded by a later operation on the same row'}
+        pending[key] = (index, item)
+
+    adds = sorted(value for value in pending.values() if value[1].get('op', 'add') == 'add')
+    removes = dict((key, value) for key, value in pending.items() if value[1].get('op') == 'remove')
+
+    table = model.__table__
+
+    # An add pointing at a user, event or product that does not exist would
+    # fail the commit of the whole batch, so those are reported on their own
+    missing = _missing_references(table, [item for _, item in adds])
+    if missing:
+        remaining = []
+        for index, item in adds:
+            unknown = [column for column in sorted(missing) if item[column] in missing[column]]
+            if unknown:
+                results[index] = {'index': index, 'status': 404, 'error': 'Not found: {}'.format(
+                    ', '.join('{} {}'.format(column, item[column]) for column in unknown))}
+            else:
+                remaining.append((index, item))
+        adds = remaining
+
+    columns = ('id',) + tuple(key_columns) + tuple(value_columns)
+
+    # One multi-row upsert for every added row
+    rows = [dict((column, item[column]) for column in columns[1:]) for _, item in adds]
+    for (index, _), (row, inserted) in zip(adds, upsert_many(model, rows, key_columns, update=value_columns)):
+        results[index] = dict(_serialize(row, columns), index=index, status=201 if inserted else 200)
+
+    # One select and one delete for every removed row
+    if removes:
+        where = or_(*[
+            and_(*[table.c[column] == value for column, value in zip(key_columns, key)])
+            for key in removes
+        ])
+        existing = dict(
+            (tuple(row[column] for column in key_columns), row)
+            for row in db.session.execute(table.select().where(where))
+        )
+        if existing:
+            ids = [row['id'] for row in existing.values()]
+            db.session.execute(table.delete().where(table.c.id.in_(ids)))
+            # Core deletes do not fire the mapper events that record these
+            Tombstone.record(db.session, table.name, ids, [row['user_id'] for row in existing.values()])
+            counters.removed(model, existing.values())
+
+        for key, (index, _) in removes.items():
+            if key in existing:
+                results[index] = dict(_serialize(existing[key], columns), index=index, status=200)
+            else:
+                results[index] = {'index': index, 'status': 404, 'error': 'Not found'}
+
+    return results
+
+
+def _validate(item, key_columns, value_columns):
+    if not isinstance(item, dict):
+        return 'Expected an object'
+
+    op = item.get('op', 'add')
+    if op not in ('add', 'remove'):
+        return 'Unknown op {}'.format(op)
+
+    for column in key_columns:
+        value = item.get(column)
+        if not isinstance(value, integer_types) or isinstance(value, bool) or value <= 0:
+            return 'Missing or invalid {}'.format(column)
+
+    if op == 'add':
+        for column in value_columns:
+            if not item.get(column):
+                return 'Missing {}'.format(column)
+    return None
+
+
+def _missing_references(table, items):
+    # {column: ids with no row} for the foreign keys of `table`, one query
+    # per referenced table
+    missing = {}
+    for column in table.columns:
+        for foreign_key in column.foreign_keys:
+            ids = set(item[column.name] for item in items if item.get(column.name) is not None)
+            if not ids:
+                continue
+            target = foreign_key.column
+            found = set(value for value, in db.session.execute(select([target]).where(target.in_(ids))))
+            if ids - found:
+                missing[column.name] = ids - found
+    return missing
+
+
+def _serialize(row, columns):
+    return dict((column, row[column]) for column in columns)
@@ -0,0 +1,107 @@
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+import time
+
+from flask import current_app, request
+
+from app.compression import compressor
+from app.encoding import negotiated_renderer
+from app.metrics import metrics
+from app.versions import table_versions
+
+
+class ResponseCache(object):
+    # LRU cache of already-serialized response bodies and their compressed
+    # variants, keyed by endpoint, arguments, negotiated media type and the
+    # versions of `tables`. Write handlers call bump() to drop everything at
+    # once; writes made through another gunicorn worker show up as a table
+    # version change, and entries expire after `ttl` seconds anyway.
+
+    def __init__(self, name, tables=(), max_entries=256, ttl=60):
+        self.name = name
+        self.tables = tables
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def init_app(self, app):
+        prefix = self.name.upper() + '_CACHE_'
+        self.max_entries = app.config.get(prefix + 'MAX_ENTRIES', self.max_entries)
+        self.ttl = app.config.get(prefix + 'TTL', self.ttl)
+
+    def cached(self, view_function):
+        @wraps(view_function)
+        def decorated_function(*args, **kwargs):
+            key = self.key()
+            entry = self.get(key)
+            if entry is not None:
+                body, status, headers, variants = entry
+                response = current_app.response_class(body, status=status, headers=headers)
+                compressor.compress(response, variants)
+                return response
+
+            # A bump while the view runs means its body may already be stale
+            version = self.version
+            response = view_function(*args, **kwargs)
+            response = current_app.make_response(response)
+            if response.status_code == 200:
+                headers = [(name, value) for name, value in response.headers if name != 'Content-Length']
+                # Compressed copies of the body are added to the entry on demand
+                variants = {}
+                self.set(key, (response.get_data(), response.status_code, headers, variants), version)
+                compressor.compress(response, variants)
+            return response
+        return decorated_function
+
+    def key(self):
+        return (
+            request.endpoint,
+            tuple(sorted(request.view_args.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            negotiated_renderer().media_type,
+            table_versions.get(*self.tables)
+        )
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.pop(key, None)
+            if item is None or item[1] <= time.time():
+                self.misses += 1
+                metrics.cache_lookup(self.name, False)
+                return None
+            # Re-inserting moves the entry to the most recently used end
+            self._entries[key] = item
+            self.hits += 1
+            metrics.cache_lookup(self.name, True)
+            return item[2]
+
+    def set(self, key, value, version):
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (version, time.time() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'entries': len(self._entries),
+            'version': self.version,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+catalog_cache = ResponseCache('catalog', tables=('products', 'categories'))
@@ -0,0 +1,123 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class Compressor(object):
+    # Compresses responses with the best encoding the client accepts (br when
+    # the brotli package is installed, then gzip). Bodies smaller than
+    # COMPRESS_MIN_SIZE bytes are sent as they are. Streamed lists are
+    # compressed chunk by chunk, so they keep streaming.
+    #
+    # Each encoding gets its own ETag ("<tag>-gzip"), as the bytes differ.
+
+    def __init__(self, min_size=1024, level=6, br_level=4):
+        self.min_size = min_size
+        self.level = level
+        self.br_level = br_level
+        self.mimetypes = DEFAULT_MIMETYPES
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.br_level = app.config.get('COMPRESS_BR_LEVEL', self.br_level)
+        self.mimetypes = app.config.get('COMPRESS_MIMETYPES', self.mimetypes)
+        app.after_request(self.after_request)
+
+    def after_request(self, response):
+        response.vary.add('Accept-Encoding')
+
+        if 'Content-Encoding' not in response.headers:
+            self.compress(response)
+
+        tag, weak = response.get_etag()
+        if tag:
+            coding = response.headers.get('Content-Encoding')
+            if response.status_code == 304:
+                # Answer with the variant the client holds
+                coding = next((name for name in CODINGS
+                               if request.if_none_match.contains('{}-{}'.format(tag, name))), None)
+            if coding in CODINGS:
+                response.set_etag('{}-{}'.format(tag, coding), weak)
+        return response
+
+    def compress(self, response, variants=None):
+        # `variants` is a dict kept with a cached body; compressed bodies are
+        # stored in it so that each one is only computed once
+        if not self.compressible(response):
+            return
+
+        coding = self.negotiate()
+        if coding is None:
+            return
+
+        if response.is_streamed:
+            response.response = self._stream(response.iter_encoded(), coding)
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return
+            if variants is None:
+                response.set_data(self._compress(body, coding, self.level, self.br_level))
+            else:
+                if coding not in variants:
+                    # Computed once per entry, so it may as well be small
+                    variants[coding] = self._compress(body, coding, 9, 11)
+                response.set_data(variants[coding])
+        response.headers['Content-Encoding'] = coding
+
+    def compressible(self, response):
+        return (
+            200 <= response.status_code < 300 and response.status_code not in (204, 206) and
+            not response.direct_passthrough and
+            response.mimetype in self.mimetypes and
+            request.method != 'HEAD'
+        )
+
+    def negotiate(self):
+        offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+        return request.accept_encodings.best_match(offered)
+
+    def _compress(self, body, coding, level, br_level):
+        if coding == 'br':
+            return brotli.compress(body, quality=br_level)
+        # wbits=31 writes the gzip container
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(body) + compressor.flush()
+
+    def _stream(self, chunks, coding):
+        if coding == 'br':
+            compressor = brotli.Compressor(quality=self.br_level)
+            for chunk in chunks:
+                yield compressor.process(chunk) + compressor.flush()
+            yield compressor.finish()
+        else:
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+            for chunk in chunks:
+                # A sync flush hands every chunk to the client as it is produced
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+
+
+def encoded_etags(etag):
+    # Every ETag a client may hold for a response tagged `etag`
+    return [etag] + ['{}-{}'.format(etag, coding) for coding in CODINGS]
+
+
+CODINGS = ('br', 'gzip')
+
+DEFAULT_MIMETYPES = [
+    'application/json',
+    'application/vnd.habituate.columnar+json',
+    'application/x-msgpack',
+    'text/html',
+    'text/plain'
+]
+
+compressor = Compressor()
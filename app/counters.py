@@ -0,0 +1,289 @@
+from collections import defaultdict
+
+from sqlalchemy import and_, bindparam, event, func, inspect, or_, select
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.models import Event, Product, Like, Attend, Favourite, EventAttendCount
+
+
+class ColumnCounter(object):
+    # parent.<column> = number of `model` rows pointing at the parent
+    # through `foreign_key`
+
+    def __init__(self, model, foreign_key, parent, column):
+        self.model = model
+        self.table = model.__table__
+        self.columns = (foreign_key,)
+        self.parent = parent.__table__
+        self.column = column
+
+    def key(self, values):
+        value = values[self.columns[0]]
+        return None if value is None else (int(value),)
+
+    def apply(self, connection, deltas):
+        params = [{'b_id': key[0], 'b_delta': delta} for key, delta in sorted(deltas.items()) if delta]
+        if not params:
+            return
+        parent = self.parent
+        connection.execute(
+            parent.update().where(parent.c.id == bindparam('b_id')).values({
+                parent.c[self.column]: parent.c[self.column] + bindparam('b_delta'),
+                # A like is not a change to the event as far as the delta sync is concerned
+                parent.c.updated_at: parent.c.updated_at
+            }),
+            params
+        )
+
+    def recount(self, connection, ids=None):
+        parent = self.parent
+        count = select([func.count()]).where(self.table.c[self.columns[0]] == parent.c.id).as_scalar()
+        stmt = parent.update().values({parent.c[self.column]: count, parent.c.updated_at: parent.c.updated_at})
+        if ids is not None:
+            stmt = stmt.where(parent.c.id.in_(ids))
+        connection.execute(stmt)
+
+    def verify(self, connection):
+        # [(key, stored, actual)] for every parent whose counter is wrong
+        foreign_key = self.table.c[self.columns[0]]
+        actual = dict(connection.execute(select([foreign_key, func.count()]).group_by(foreign_key)).fetchall())
+        return [
+            ((parent_id,), stored, actual.get(parent_id, 0))
+            for parent_id, stored in connection.execute(select([self.parent.c.id, self.parent.c[self.column]]))
+            if stored != actual.get(parent_id, 0)
+        ]
+
+    def describe(self):
+        return '{}.{}'.format(self.parent.name, self.column)
+
+
+class AttendCounter(object):
+    # event_attend_counts.count = attends of an event with a given will_go.
+    # Rows are created on first use and left at 0 afterwards.
+
+    def __init__(self):
+        self.model = Attend
+        self.table = Attend.__table__
+        self.columns = ('event_id', 'will_go')
+        self.counts = EventAttendCount.__table__
+
+    def key(self, values):
+        if values['event_id'] is None or values['will_go'] is None:
+            return None
+        return (int(values['event_id']), values['will_go'])
+
+    def apply(self, connection, deltas):
+        params = [{'b_event_id': key[0], 'b_will_go': key[1], 'b_delta': delta}
+                  for key, delta in sorted(deltas.items()) if delta]
+        if not params:
+            return
+        counts = self.counts
+
+        if connection.dialect.name == 'postgresql':
+            stmt = postgresql.insert(counts).values(
+                event_id=bindparam('b_event_id'), will_go=bindparam('b_will_go'), count=bindparam('b_delta'))
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=['event_id', 'will_go'], set_={'count': counts.c.count + stmt.excluded.count}
+            ), params)
+            return
+
+        # Without ON CONFLICT in this SQLAlchemy version; SQLite has a single
+        # writer, so the row cannot appear between the two statements
+        where = and_(counts.c.event_id == bindparam('b_event_id'), counts.c.will_go == bindparam('b_will_go'))
+        for values in params:
+            if connection.execute(counts.update().where(where).values(
+                    count=counts.c.count + bindparam('b_delta')), values).rowcount == 0:
+                connection.execute(counts.insert().values(
+                    event_id=bindparam('b_event_id'), will_go=bindparam('b_will_go'),
+                    count=bindparam('b_delta')), values)
+
+    def recount(self, connection, ids=None):
+        counts = self.counts
+        attends = self.table
+        where = attends.c.will_go.isnot(None)
+        delete = counts.delete()
+        if ids is not None:
+            where = and_(where, attends.c.event_id.in_(ids))
+            delete = delete.where(counts.c.event_id.in_(ids))
+        connection.execute(delete)
+        connection.execute(counts.insert().from_select(
+            ['event_id', 'will_go', 'count'],
+            select([attends.c.event_id, attends.c.will_go, func.count()]).where(where)
+            .group_by(attends.c.event_id, attends.c.will_go)
+        ))
+
+    def verify(self, connection):
+        attends = self.table
+        actual = dict(
+            ((event_id, will_go), count)
+            for event_id, will_go, count in connection.execute(
+                select([attends.c.event_id, attends.c.will_go, func.count()])
+                .where(attends.c.will_go.isnot(None)).group_by(attends.c.event_id, attends.c.will_go))
+        )
+        stored = dict(
+            ((event_id, will_go), count)
+            for event_id, will_go, count in connection.execute(
+                select([self.counts.c.event_id, self.counts.c.will_go, self.counts.c.count]))
+        )
+        return [
+            (key, stored.get(key, 0), actual.get(key, 0))
+            for key in sorted(set(actual) | set(stored))
+            if stored.get(key, 0) != actual.get(key, 0)
+        ]
+
+    def describe(self):
+        return self.counts.name
+
+
+class Counters(object):
+    # Denormalized popularity counters, changed in the same transaction as
+    # the likes, attends and favourites they count:
+    #
+    #   events.like_count          likes per event
+    #   products.favourite_count   favourites per product
+    #   event_attend_counts        attends per event and will_go
+    #
+    # Counters move by +n/-n with UPDATE ... SET c = c + n, never by
+    # recounting, so concurrent transactions cannot overwrite each other.
+    # ORM writes are tracked by mapper events (watch()); the Core statements
+    # of upsert_many() and apply_batch() report their changes through
+    # upserted() and removed(). "python manage.py verify_counters" compares
+    # them with the real counts and "rebuild_counters" recomputes them.
+
+    def __init__(self, *counters):
+        self._counters = dict((counter.model, counter) for counter in counters)
+
+    def __iter__(self):
+        return iter(self._counters.values())
+
+    def get(self, model):
+        return self._counters.get(model)
+
+    def watch(self):
+        for model in self._counters:
+            for name, listener in (('after_insert', self._on_insert),
+                                   ('before_delete', self._on_delete),
+                                   ('before_update', self._on_update)):
+                if not event.contains(model, name, listener):
+                    event.listen(model, name, listener)
+
+    ############# Core statements #############
+
+    def existing(self, model, rows, index_elements, update):
+        # The counted values of the rows an upsert is about to update, read
+        # (and on Postgres locked) before the upsert overwrites them. Only
+        # needed when the upsert can change a counted column.
+        counter = self.get(model)
+        if counter is None or not set(update) & set(counter.columns):
+            return {}
+
+        table = counter.table
+        columns = list(index_elements) + [column for column in counter.columns if column not in index_elements]
+        where = or_(*[and_(*[table.c[column] == values[column] for column in index_elements]) for values in rows])
+        query = select([table.c[column] for column in columns]).where(where)
+        connection = db.session.connection()
+        return dict(
+            (tuple(row[column] for column in index_elements), counter.key(row))
+            for row in connection.execute(query.with_for_update())
+        )
+
+    def upserted(self, model, existing, results, index_elements):
+        # `results` are the (row, inserted) pairs returned by upsert_many()
+        counter = self.get(model)
+        if counter is None:
+            return
+
+        deltas = defaultdict(int)
+        for row, inserted in results:
+            new = counter.key(row)
+            if inserted:
+                old = None
+            else:
+                # A row inserted by another transaction after existing() ran
+                # is taken as unchanged; verify_counters reports the rare miss
+                old = existing.get(tuple(row[column] for column in index_elements), new)
+            if old != new:
+                if old is not None:
+                    deltas[old] -= 1
+                if new is not None:
+                    deltas[new] += 1
+        counter.apply(db.session.connection(), deltas)
+
+    def removed(self, model, rows):
+        counter = self.get(model)
+        if counter is None:
+            return
+
+        deltas = defaultdict(int)
+        for row in rows:
+            key = counter.key(row)
+            if key is not None:
+                deltas[key] -= 1
+        counter.apply(db.session.connection(), deltas)
+
+    ############# Mapper events #############
+
+    def _on_insert(self, mapper, connection, target):
+        counter = self.get(mapper.class_)
+        key = counter.key(_values(target, counter.columns))
+        if key is not None:
+            counter.apply(connection, {key: 1})
+
+    def _on_delete(self, mapper, connection, target):
+        # Before the DELETE, while the row can still be loaded if it expired
+        counter = self.get(mapper.class_)
+        key = counter.key(_values(target, counter.columns))
+        if key is not None:
+            counter.apply(connection, {key: -1})
+
+    def _on_update(self, mapper, connection, target):
+        counter = self.get(mapper.class_)
+        state = inspect(target)
+        if not any(state.attrs[column].history.has_changes() for column in counter.columns):
+            return
+
+        # The old values from the row itself; the attribute history is empty
+        # for columns that were expired when they were set
+        table = counter.table
+        old = connection.execute(
+            select([table.c[column] for column in counter.columns]).where(table.c.id == target.id)
+        ).first()
+        old = counter.key(old) if old is not None else None
+        new = counter.key(_values(target, counter.columns))
+        if old != new:
+            deltas = defaultdict(int)
+            if old is not None:
+                deltas[old] -= 1
+            if new is not None:
+                deltas[new] += 1
+            counter.apply(connection, deltas)
+
+    ############# Maintenance #############
+
+    def rebuild(self):
+        connection = db.session.connection()
+        for counter in self:
+            counter.recount(connection)
+        db.session.commit()
+
+    def verify(self):
+        # {counter name: [(key, stored, actual)]} for the counters that are off
+        connection = db.session.connection()
+        results = {}
+        for counter in self:
+            mismatches = counter.verify(connection)
+            if mismatches:
+                results[counter.describe()] = mismatches
+        return results
+
+
+def _values(target, columns):
+    return dict((column, getattr(target, column)) for column in columns)
+
+
+counters = Counters(
+    ColumnCounter(Like, 'event_id', Event, 'like_count'),
+    ColumnCounter(Favourite, 'product_id', Product, 'favourite_count'),
+    AttendCounter()
+)
@@ -0,0 +1,86 @@
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import NullPool
+
+# Used when instance/config.py does not set them
+POOL_DEFAULTS = {
+    'DB_POOL_SIZE': 5,
+    'DB_MAX_OVERFLOW': 10,
+    # Waiting longer than this for a connection is worse than failing
+    'DB_POOL_TIMEOUT': 10,
+    'DB_POOL_RECYCLE': 1800,
+    # Replaces connections that died with a Postgres restart before use
+    'DB_POOL_PRE_PING': True
+}
+
+
+def configure_engine(app):
+    # Builds SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings. Must run before
+    # db.init_app(). Anything already in SQLALCHEMY_ENGINE_OPTIONS wins.
+    #
+    # With DB_PGBOUNCER, connections are opened and closed per checkout
+    # (NullPool) and PgBouncer does the pooling. psycopg2 sends every query
+    # as plain text, without server-side prepared statements, so transaction
+    # pooling is safe.
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    options = {}
+
+    if uri.startswith('sqlite'):
+        # Flask-SQLAlchemy picks the pool for SQLite itself
+        pass
+    elif app.config.get('DB_PGBOUNCER'):
+        options['poolclass'] = NullPool
+    else:
+        def setting(name):
+            return app.config.get(name, POOL_DEFAULTS[name])
+
+        options.update(
+            pool_size=setting('DB_POOL_SIZE'),
+            max_overflow=setting('DB_MAX_OVERFLOW'),
+            pool_timeout=setting('DB_POOL_TIMEOUT'),
+            pool_recycle=setting('DB_POOL_RECYCLE'),
+            pool_pre_ping=setting('DB_POOL_PRE_PING')
+        )
+
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def pool_status(engine):
+    pool = engine.pool
+    status = {'class': type(pool).__name__}
+    # Only QueuePool keeps counts; NullPool and the SQLite pools do not
+    if hasattr(pool, 'overflow'):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow())
+        )
+    return status
+
+
+def ping(engine):
+    # Round trip to the database in milliseconds, or None if it is unreachable
+    start = time.time()
+    try:
+        connection = engine.connect()
+        try:
+            connection.execute(text('SELECT 1'))
+        finally:
+            connection.close()
+    except SQLAlchemyError:
+        return None
+    return (time.time() - start) * 1000
+
+
+def dispose_engines(app):
+    # Drops the pooled connections of every engine (the primary and any
+    # binds, such as the replica). For processes forked from one that loaded
+    # the app, like gunicorn workers with preload_app: a connection shared
+    # by two processes mixes up their queries.
+    db = app.extensions['sqlalchemy'].db
+    for bind in [None] + list(app.config.get('SQLALCHEMY_BINDS') or {}):
+        db.get_engine(app, bind=bind).dispose()
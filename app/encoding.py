@@ -0,0 +1,172 @@
+from datetime import date, time
+from decimal import Decimal
+from itertools import chain
+import json
+
+from flask import current_app, request
+from flask_api.exceptions import NotAcceptable
+from flask_api.renderers import BaseRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class Encoder(object):
+    # JSON backend used by every response the API renders. orjson is several
+    # times faster than the stdlib encoder and is picked whenever it is
+    # installed, unless JSON_BACKEND says otherwise ('orjson' or 'json').
+
+    def __init__(self):
+        self.backend = 'orjson' if orjson is not None else 'json'
+
+    def init_app(self, app):
+        backend = app.config.get('JSON_BACKEND', self.backend)
+        if backend == 'orjson' and orjson is None:
+            backend = 'json'
+        self.backend = backend
+
+        app.config.setdefault('DEFAULT_RENDERERS', DEFAULT_RENDERERS)
+        app.after_request(vary_on_accept)
+
+    def dumps(self, data):
+        # Always compact, always bytes
+        if self.backend == 'orjson':
+            return orjson.dumps(data, default=_default)
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False, default=_default).encode('utf-8')
+
+
+def _default(obj):
+    if isinstance(obj, (Decimal, date, time)):
+        return str(obj)
+    raise TypeError('{!r} is not JSON serializable'.format(obj))
+
+
+####################################
+#             Renderers            #
+####################################
+
+class JSONRenderer(BaseRenderer):
+    # application/json, an array of objects for lists
+    media_type = 'application/json'
+    charset = None
+
+    def render(self, data, media_type=None, **options):
+        return encoder.dumps(data)
+
+    def stream(self, objects):
+        return buffered(b'[', (encoder.dumps(obj) for obj in objects), b']')
+
+
+class ColumnarRenderer(BaseRenderer):
+    # Lists are sent as {"columns": [...], "rows": [[...], ...]} so that the
+    # keys are not repeated on every row. Anything else is plain JSON.
+    media_type = 'application/vnd.habituate.columnar+json'
+    charset = None
+
+    def render(self, data, media_type=None, **options):
+        if isinstance(data, list):
+            data = columnar(data)
+        return encoder.dumps(data)
+
+    def stream(self, objects):
+        # Rows of a streamed list all come from the same serializer, so the
+        # keys of the first one are the columns
+        objects = iter(objects)
+        first = next(objects, None)
+        if first is None:
+            return iter([self.render([])])
+
+        columns = list(first)
+        rows = (encoder.dumps([obj.get(column) for column in columns]) for obj in chain([first], objects))
+        return buffered(b'{"columns":' + encoder.dumps(columns) + b',"rows":[', rows, b']}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    # Only offered when msgpack is installed
+    media_type = 'application/x-msgpack'
+    charset = None
+
+    def render(self, data, media_type=None, **options):
+        return msgpack.packb(data, use_bin_type=True, default=_default)
+
+    def stream(self, objects):
+        # A MessagePack array starts with its length, so lists are packed whole
+        return iter([self.render(list(objects))])
+
+
+def columnar(objects):
+    columns = []
+    for obj in objects:
+        for name in obj:
+            if name not in columns:
+                columns.append(name)
+    return {
+        'columns': columns,
+        'rows': [[obj.get(column) for column in columns] for obj in objects]
+    }
+
+
+def buffered(head, items, tail, chunk_size=16384):
+    # Joins items with commas between head and tail, flushing roughly every
+    # chunk_size bytes so the WSGI server is not handed one tiny write per row
+    buffer = [head]
+    size = len(head)
+    separator = b''
+    for item in items:
+        item = separator + item
+        separator = b','
+        buffer.append(item)
+        size += len(item)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(tail)
+    yield b''.join(buffer)
+
+
+####################################
+#        Content negotiation       #
+####################################
+
+def negotiated_renderer():
+    # The renderer picked by Flask-API from the Accept header. Clients that
+    # accept none of ours (or only the browsable API) get JSON.
+    try:
+        renderer = request.accepted_renderer
+    except NotAcceptable:
+        return JSON
+    if not hasattr(renderer, 'stream'):
+        return JSON
+    return renderer
+
+
+def jsonify(data):
+    # Drop-in for flask.jsonify, encoded in the negotiated format
+    renderer = negotiated_renderer()
+    return current_app.response_class(renderer.render(data), mimetype=renderer.media_type)
+
+
+def vary_on_accept(response):
+    response.vary.add('Accept')
+    return response
+
+
+JSON = JSONRenderer()
+
+DEFAULT_RENDERERS = [
+    'app.encoding.JSONRenderer',
+    'app.encoding.ColumnarRenderer'
+]
+if msgpack is not None:
+    DEFAULT_RENDERERS.append('app.encoding.MessagePackRenderer')
+DEFAULT_RENDERERS.append('flask_api.renderers.BrowsableAPIRenderer')
+
+encoder = Encoder()
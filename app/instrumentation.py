@@ -0,0 +1,113 @@
+from collections import Counter
+import json
+import logging
+import random
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('app.sql')
+
+
+class SQLStats(object):
+    # Counts the queries each request runs and the time spent in them, using
+    # engine events. Sampled requests get a Server-Timing header and one
+    # structured log line:
+    #
+    #   Server-Timing: db;desc="3 queries";dur=1.92, app;dur=6.40
+    #
+    # The header is written before streamed bodies are produced, so it only
+    # covers the queries run until then; the log line is written when the
+    # request ends and covers all of them.
+    #
+    # With N+1 detection on, a statement that runs SQL_N_PLUS_ONE_THRESHOLD
+    # times or more in one request (a query per row) is logged as a warning.
+    #
+    # Every request is sampled in development (DEBUG) and one in a hundred
+    # otherwise; SQL_STATS_SAMPLE_RATE overrides this, and 0 turns it off.
+
+    def __init__(self):
+        self.sample_rate = 0
+        self.detect_n_plus_one = False
+        self.threshold = 5
+
+    def init_app(self, app):
+        self.sample_rate = app.config.get('SQL_STATS_SAMPLE_RATE', 1.0 if app.debug else 0.01)
+        self.detect_n_plus_one = app.config.get('SQL_N_PLUS_ONE', app.debug)
+        self.threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', self.threshold)
+        if not self.sample_rate:
+            return
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        app.before_request(self.start)
+        app.after_request(self.add_header)
+        app.teardown_request(self.finish)
+
+    def start(self):
+        if random.random() < self.sample_rate:
+            g.sql_stats = {
+                'start': time.time(),
+                'queries': 0,
+                'db': 0.0,
+                'statements': Counter() if self.detect_n_plus_one else None
+            }
+
+    def add_header(self, response):
+        stats = g.get('sql_stats')
+        if stats is not None:
+            stats['status'] = response.status_code
+            response.headers['Server-Timing'] = 'db;desc="{} queries";dur={:.2f}, app;dur={:.2f}'.format(
+                stats['queries'], stats['db'] * 1000, (time.time() - stats['start']) * 1000)
+        return response
+
+    def finish(self, exception=None):
+        stats = g.pop('sql_stats', None)
+        if stats is None:
+            return
+
+        total = time.time() - stats['start']
+        repeated = []
+        if stats['statements'] is not None:
+            repeated = [(statement, count) for statement, count in stats['statements'].most_common()
+                        if count >= self.threshold]
+            for statement, count in repeated:
+                logger.warning('Possible N+1 in %s: %d x %s', request.endpoint, count, ' '.join(statement.split())[:200])
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': stats.get('status', 500),
+            'queries': stats['queries'],
+            'db_ms': round(stats['db'] * 1000, 2),
+            'app_ms': round((total - stats['db']) * 1000, 2),
+            'total_ms': round(total * 1000, 2),
+            'repeated': len(repeated)
+        }, sort_keys=True))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_stats' in g:
+        conn.info.setdefault('query_start', []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'sql_stats' in g):
+        return
+    starts = conn.info.get('query_start')
+    if not starts:
+        return
+
+    stats = g.sql_stats
+    stats['queries'] += 1
+    stats['db'] += time.time() - starts.pop()
+    if stats['statements'] is not None:
+        stats['statements'][statement] += 1
+
+
+sql_stats = SQLStats()
@@ -0,0 +1,99 @@
+import os
+import time
+
+from flask import current_app, g, request
+
+from app import db
+from app.database import pool_status
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, \
+        generate_latest
+    from prometheus_client import multiprocess
+except ImportError:
+    multiprocess = None
+
+# Seconds; event nights are expected to push the slow routes past 1s
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metrics(object):
+    # Prometheus metrics served at /metrics: requests and latency per route,
+    # status codes, the SQLAlchemy pool of each worker and response cache
+    # lookups.
+    #
+    # Under gunicorn every worker writes its samples to files in the
+    # directory named by the prometheus_multiproc_dir environment variable,
+    # and /metrics aggregates all of them, whichever worker answers. The
+    # directory must be emptied before gunicorn starts (see gunicorn.conf.py).
+    #
+    # Does nothing when prometheus_client is not installed or METRICS_ENABLED
+    # is False.
+
+    def __init__(self):
+        self.enabled = False
+        self._metrics = None
+
+    def init_app(self, app):
+        self.enabled = multiprocess is not None and app.config.get('METRICS_ENABLED', True)
+        if not self.enabled:
+            return
+
+        if self._metrics is None:
+            # Metrics are registered globally, once per process
+            self._metrics = self._create()
+
+        app.before_request(self.start)
+        app.after_request(self.record)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+
+    def _create(self):
+        return {
+            'requests': Counter('http_requests_total', 'HTTP requests',
+                                ['method', 'endpoint', 'status']),
+            'latency': Histogram('http_request_duration_seconds', 'Time until the response headers are ready',
+                                 ['method', 'endpoint'], buckets=BUCKETS),
+            'pool_size': Gauge('db_pool_size', 'Connections kept in the SQLAlchemy pool',
+                               multiprocess_mode='livesum'),
+            'pool_checked_out': Gauge('db_pool_checked_out', 'Connections in use',
+                                      multiprocess_mode='livesum'),
+            'pool_overflow': Gauge('db_pool_overflow', 'Connections open beyond the pool size',
+                                   multiprocess_mode='livesum'),
+            'cache': Counter('response_cache_lookups_total', 'Response cache lookups',
+                             ['cache', 'result'])
+        }
+
+    def start(self):
+        g.metrics_start = time.time()
+
+    def record(self, response):
+        start = g.get('metrics_start')
+        if start is None:
+            return response
+
+        # Unmatched URLs share one label so that scanners cannot blow up cardinality
+        endpoint = request.endpoint or 'unmatched'
+        self._metrics['requests'].labels(request.method, endpoint, str(response.status_code)).inc()
+        self._metrics['latency'].labels(request.method, endpoint).observe(time.time() - start)
+
+        pool = pool_status(db.get_engine(current_app))
+        if 'size' in pool:
+            self._metrics['pool_size'].set(pool['size'])
+            self._metrics['pool_checked_out'].set(pool['checked_out'])
+            self._metrics['pool_overflow'].set(pool['overflow'])
+        return response
+
+    def cache_lookup(self, name, hit):
+        if self.enabled:
+            self._metrics['cache'].labels(name, 'hit' if hit else 'miss').inc()
+
+    def view(self):
+        if 'prometheus_multiproc_dir' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return current_app.response_class(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+metrics = Metrics()
@@ -1,6 +1,18 @@
 from app import db
+from app.versions import table_versions
+from datetime import datetime
+from sqlalchemy import event
 
-class User(db.Model):
+class Timestamps(object):
+    # created_at/updated_at for the delta sync (GET /api/v1/sync/?since=).
+    # Set by SQLAlchemy on insert and update; server_default fills rows that
+    # existed before the columns did.
+
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=db.func.now(), index=True)
+
+class User(Timestamps, db.Model):
     __tablename__ = "users"
 
     ############# Table fields #############
@@ -40,7 +52,7 @@ class User(db.Model):
     def __repr__(self):
         return '{id:'+str(self.id)+', name:'+self.name+' , email:'+self.email+', joined:'+self.start_date+', profile_pic:'+self.profile_pic+'}'
 
-class Event(db.Model):
+class Event(Timestamps, db.Model):
     __tablename__ = "events"
 
     ############# Table fields #############
@@ -52,6 +64,11 @@ class Event(db.Model):
     description = db.Column(db.Text, nullable=False)
     picture = db.Column(db.Text)
     event_type = db.Column(db.String(20), nullable=False)
+    # Kept by app/counters.py
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Serves the news and event listings, which filter on event_type and sort by date
+    __table_args__ = (db.Index('ix_events_event_type_date', 'event_type', 'date'),)
 
     ############# Relationships #############
 
@@ -69,6 +86,7 @@ class Event(db.Model):
 
     def save(self):
         db.session.add(self)
+        table_versions.touch(self.__tablename__)
         db.session.commit()
 
     @staticmethod
@@ -77,12 +95,13 @@ class Event(db.Model):
 
     def delete(self):
         db.session.delete(self)
+        table_versions.touch(self.__tablename__)
         db.session.commit()
         
     def __repr__(self):
         return '<Event: {}>'.format(self.title)
 
-class Product(db.Model):
+class Product(Timestamps, db.Model):
     __tablename__ = "products"
 
     ############# Table fields #############
@@ -96,6 +115,8 @@ class Product(db.Model):
     picture = db.Column(db.Text)
     available = db.Column(db.Boolean, server_default='t', default=True)
     price = db.Column(db.Numeric(3,2), nullable=False)
+    # Kept by app/counters.py; indexed for the top favourites ranking
+    favourite_count = db.Column(db.Integer, nullable=False, default=0, server_default='0', index=True)
 
     ############# Relationship #############
 
@@ -115,6 +136,7 @@ class Product(db.Model):
     
     def save(self):
         db.session.add(self)
+        table_versions.touch(self.__tablename__)
         db.session.commit()
 
     @staticmethod
@@ -123,12 +145,13 @@ class Product(db.Model):
     
     def delete(self):
         db.session.delete(self)
+        table_versions.touch(self.__tablename__)
         db.session.commit()
 
     def __repr__(self):
         return '{id:'+str(self.id)+', name:'+str(self.name)+' , description:'+str(self.description)+', category_id:'+self.category_id+', proof:'+self.proof+', country:'+self.country+', picture:'+self.picture+', available:'+self.available+', price:'+self.price+'}'
 
-class Category(db.Model):
+class Category(Timestamps, db.Model):
     __tablename__ = "categories"
 
     ############# Table fields #############
@@ -145,6 +168,7 @@ class Category(db.Model):
 
     def save(self):
         db.session.add(self)
+        table_versions.touch(self.__tablename__)
         db.session.commit()
 
     @staticmethod
@@ -153,12 +177,14 @@ class Category(db.Model):
 
     def delete(self):
         db.session.delete(self)
+        # Its products are deleted with it
+        table_versions.touch(self.__tablename__, 'products')
         db.session.commit()
 
     def __repr__(self):
         return '<Category {}>'.format(self.name)
 
-class Like(db.Model):
+class Like(Timestamps, db.Model):
     __tablename__ = "likes"
 
     ############# Table fields #############
@@ -167,6 +193,10 @@ class Like(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
 
+    # The unique constraint leads with user_id; per-event counts need their own index
+    __table_args__ = (db.UniqueConstraint('user_id', 'event_id', name='uq_likes_user_id_event_id'),
+                      db.Index('ix_likes_event_id', 'event_id'))
+
     ############# Relationship #############
 
     user = db.relationship("User", backref=db.backref("likes", cascade="all, delete-orphan"))
@@ -193,7 +223,7 @@ class Like(db.Model):
     def __repr__(self):
         return '<Likes {}>'.format(self.body)
 
-class Attend(db.Model):
+class Attend(Timestamps, db.Model):
     __tablename__ = "attends"
 
     ############# Table fields #############
@@ -203,6 +233,10 @@ class Attend(db.Model):
     event_id = db.Column(db.Integer, db.ForeignKey('events.id'))
     will_go = db.Column(db.String(15))
 
+    # Counting by event and will_go reads only this index
+    __table_args__ = (db.UniqueConstraint('user_id', 'event_id', name='uq_attends_user_id_event_id'),
+                      db.Index('ix_attends_event_id_will_go', 'event_id', 'will_go'))
+
     ############# Relationship #############
 
     user = db.relationship("User", backref=db.backref("attends", cascade="all, delete-orphan"))
@@ -230,14 +264,16 @@ class Attend(db.Model):
     def __repr__(self):
         return '{id:'+str(self.id)+', user_id:'+str(self.user_id)+' , event_id:'+str(self.event_id)+', will_go:'+self.will_go+'}'
 
-class Favourite(db.Model):
+class Favourite(Timestamps, db.Model):
     __tablename__ = 'favourites'
 
     ############# Table fields #############
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'))
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), index=True)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'product_id', name='uq_favourites_user_id_product_id'),)
 
     ############# Relationship #############
 
@@ -265,7 +301,7 @@ class Favourite(db.Model):
     def __repr__(self):
         return '{id:'+str(self.id)+', user_id:'+self.user_id+' , product_id:'+self.product_id+'}'
 
-class ApiKey(db.Model):
+class ApiKey(Timestamps, db.Model):
     __tablename__ = 'api_keys'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -279,4 +315,121 @@ class ApiKey(db.Model):
         return ApiKey.query.all()
 
     def __repr__(self):
-        return 'Key {}>'.format(self.key)
\ No newline at end of file
+        return 'Key {}>'.format(self.key)
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+
+    ############# Table fields #############
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(32), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    ############# Methods #############
+
+    def __init__(self, jti, expires_at):
+        self.jti = jti
+        self.expires_at = expires_at
+
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    @staticmethod
+    def get_active():
+        return RevokedToken.query.filter(RevokedToken.expires_at > datetime.utcnow()).all()
+
+    @staticmethod
+    def prune():
+        # An expired token is refused anyway, so its revocation can go
+        count = RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+        db.session.commit()
+        return count
+
+    def __repr__(self):
+        return '<RevokedToken {}>'.format(self.jti)
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+
+    ############# Table fields #############
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    ############# Methods #############
+
+    def __init__(self, name, version=0):
+        self.name = name
+        self.version = version
+
+    def __repr__(self):
+        return '<TableVersion {}: {}>'.format(self.name, self.version)
+
+class EventAttendCount(db.Model):
+    __tablename__ = 'event_attend_counts'
+
+    ############# Table fields #############
+
+    # Kept by app/counters.py
+    event_id = db.Column(db.Integer, db.ForeignKey('events.id', ondelete="CASCADE"), primary_key=True)
+    will_go = db.Column(db.String(15), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    ############# Methods #############
+
+    def __init__(self, event_id, will_go, count=0):
+        self.event_id = event_id
+        self.will_go = will_go
+        self.count = count
+
+    def __repr__(self):
+        return '<EventAttendCount {} {}: {}>'.format(self.event_id, self.will_go, self.count)
+
+class Tombstone(db.Model):
+    __tablename__ = 'tombstones'
+
+    ############# Table fields #############
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(50), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    # Owner of a deleted like, attend or favourite; users only sync their own
+    user_id = db.Column(db.Integer)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    # Serve "what was deleted from this table since", for everyone or one user
+    __table_args__ = (db.Index('ix_tombstones_table_name_deleted_at', 'table_name', 'deleted_at'),
+                      db.Index('ix_tombstones_table_name_user_id_deleted_at', 'table_name', 'user_id', 'deleted_at'))
+
+    ############# Methods #############
+
+    @staticmethod
+    def record(connection, table_name, ids, user_ids=None):
+        # Runs inside the caller's transaction, so a rolled back delete leaves no tombstone.
+        # `user_ids` holds the owner of each row for user-owned tables.
+        if ids:
+            connection.execute(Tombstone.__table__.insert(), [
+                {'table_name': table_name, 'row_id': row_id, 'user_id': user_id, 'deleted_at': datetime.utcnow()}
+                for row_id, user_id in zip(ids, user_ids or [None] * len(ids))
+            ])
+
+    @staticmethod
+    def prune(before):
+        count = Tombstone.query.filter(Tombstone.deleted_at < before).delete(synchronize_session=False)
+        db.session.commit()
+        return count
+
+    def __repr__(self):
+        return '<Tombstone {} {}>'.format(self.table_name, self.row_id)
+
+############# Events #############
+
+def record_tombstone(mapper, connection, target):
+    # Before the DELETE, while the owner can still be loaded if it expired
+    Tombstone.record(connection, mapper.local_table.name, [target.id], [getattr(target, 'user_id', None)])
+
+# Deletes made with Core statements (app/batch.py) record their own tombstones
+for model in (User, Event, Product, Category, Like, Attend, Favourite):
+    event.listen(model, 'before_delete', record_tombstone)
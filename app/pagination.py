@@ -0,0 +1,52 @@
+from flask import current_app, request, stream_with_context
+from six.moves.urllib.parse import urlencode
+
+from app.encoding import negotiated_renderer
+
+
+def list_response(query, key, serialize):
+    # Builds the response for a list endpoint using keyset pagination.
+    #
+    # `key` is the unique, indexed column the rows are ordered by (usually the
+    # primary key) and `serialize` turns one row into a dict whose 'id' is the
+    # value of that column.
+    #
+    #   ?cursor=<id>  only rows with key > id
+    #   ?limit=<n>    one page of at most n rows, plus a Link/X-Next-Cursor
+    #                 header when there may be more
+    #
+    # Without a limit the whole result is streamed with yield_per, so memory
+    # stays bounded however large the table is. Both are encoded in the format
+    # negotiated from the Accept header.
+    cursor = request.args.get('cursor', type=int)
+    limit = request.args.get('limit', type=int)
+
+    renderer = negotiated_renderer()
+    query = query.order_by(key.asc())
+    if cursor is not None:
+        query = query.filter(key > cursor)
+
+    if limit is None:
+        rows = query.yield_per(current_app.config.get('PAGINATION_YIELD_PER', 500))
+        return current_app.response_class(
+            stream_with_context(renderer.stream(serialize(row) for row in rows)),
+            mimetype=renderer.media_type
+        )
+
+    limit = max(1, min(limit, current_app.config.get('PAGINATION_MAX_LIMIT', 1000)))
+    results = [serialize(row) for row in query.limit(limit)]
+
+    Response = current_app.response_class(renderer.render(results), mimetype=renderer.media_type)
+    if len(results) == limit:
+        next_cursor = results[-1]['id']
+        Response.headers['X-Next-Cursor'] = str(next_cursor)
+        Response.headers['Link'] = '<{}>; rel="next"'.format(next_url(cursor=next_cursor))
+    return Response
+
+
+def next_url(**params):
+    # This request's URL with `params` replacing its query arguments
+    args = request.args.to_dict()
+    args.update(params)
+    return '{}?{}'.format(request.base_url, urlencode(sorted(args.items())))
+
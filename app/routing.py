@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+from threading import Lock
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm, text
+from sqlalchemy.exc import SQLAlchemyError
+
+# Postgres standby lag in seconds; 0 when every received change is replayed
+# (an idle primary would otherwise look lagged) and NULL on a primary
+LAG_QUERY = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+class ReplicaRouter(object):
+    # Sends the reads of GET and HEAD requests to the REPLICA_DATABASE_URI
+    # database (the 'replica' bind) and everything else to the primary.
+    #
+    # A client that has just written reads from the primary for
+    # REPLICA_STICKY_SECONDS so it sees its own writes: the worker remembers
+    # the principal, and a read_primary_until cookie carries it to the other
+    # workers. The replica is checked at most every REPLICA_CHECK_INTERVAL
+    # seconds and skipped while it is down or more than REPLICA_MAX_LAG
+    # seconds behind; a connection error on it also takes it out until the
+    # next check.
+    #
+    # Without REPLICA_DATABASE_URI everything goes to the primary.
+
+    COOKIE = 'read_primary_until'
+
+    def __init__(self, sticky_seconds=10, max_lag=5, check_interval=5):
+        self.uri = None
+        self.sticky_seconds = sticky_seconds
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._writers = {}
+        self._healthy = False
+        self._checked = 0
+        self._lock = Lock()
+
+    def init_app(self, app):
+        # Must run before db.init_app()
+        self.uri = app.config.get('REPLICA_DATABASE_URI')
+        self.sticky_seconds = app.config.get('REPLICA_STICKY_SECONDS', self.sticky_seconds)
+        self.max_lag = app.config.get('REPLICA_MAX_LAG', self.max_lag)
+        self.check_interval = app.config.get('REPLICA_CHECK_INTERVAL', self.check_interval)
+        if not self.uri:
+            return
+
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+        binds['replica'] = self.uri
+        app.config['SQLALCHEMY_BINDS'] = binds
+        app.after_request(self.remember_writes)
+
+    def engine(self, app):
+        engine = app.extensions['sqlalchemy'].db.get_engine(app, bind='replica')
+        if not event.contains(engine, 'handle_error', self._on_error):
+            event.listen(engine, 'handle_error', self._on_error)
+        return engine
+
+    def use_replica(self, session):
+        if not self.uri or not has_request_context() or request.method not in ('GET', 'HEAD'):
+            return False
+        if g.get('read_primary'):
+            return False
+        # Changes the session is about to flush go to the primary
+        if session._flushing or session.new or session.dirty or session.deleted:
+            return False
+        if self.sticky():
+            return False
+        return self.available()
+
+    def sticky(self):
+        now = time.time()
+        if request.cookies.get(self.COOKIE, 0, type=int) > now:
+            return True
+        principal = g.get('principal')
+        return principal is not None and self._writers.get(principal, 0) > now
+
+    def remember_writes(self, response):
+        if request.method in ('GET', 'HEAD', 'OPTIONS') or response.status_code >= 400:
+            return response
+
+        until = time.time() + self.sticky_seconds
+        principal = g.get('principal')
+        if principal is not None:
+            with self._lock:
+                if len(self._writers) > 10000:
+                    now = time.time()
+                    self._writers = dict(item for item in self._writers.items() if item[1] > now)
+                self._writers[principal] = until
+        response.set_cookie(self.COOKIE, str(int(until)), max_age=self.sticky_seconds, httponly=True)
+        return response
+
+    def available(self):
+        if self._checked + self.check_interval <= time.time():
+            with self._lock:
+                if self._checked + self.check_interval <= time.time():
+                    self._healthy = self._check(current_app._get_current_object())
+                    self._checked = time.time()
+        return self._healthy
+
+    def _check(self, app):
+        try:
+            connection = self.engine(app).connect()
+            try:
+                if connection.dialect.name == 'postgresql':
+                    lag = connection.execute(LAG_QUERY).scalar()
+                else:
+                    # Local stand-ins (SQLite) have no replication to lag behind
+                    connection.execute(text('SELECT 1'))
+                    lag = 0
+            finally:
+                connection.close()
+        except SQLAlchemyError:
+            return False
+        return lag is None or lag <= self.max_lag
+
+    def _on_error(self, context):
+        self._healthy = False
+        self._checked = time.time()
+
+
+@contextmanager
+def primary():
+    # Reads inside the block go to the primary, whatever the request method
+    if not has_app_context():
+        yield
+        return
+
+    previous = g.get('read_primary')
+    g.read_primary = True
+    try:
+        yield
+    finally:
+        g.read_primary = previous
+
+
+class RoutingSession(SignallingSession):
+
+    def get_bind(self, mapper=None, clause=None):
+        if router.use_replica(self):
+            return router.engine(self.app)
+        return SignallingSession.get_bind(self, mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+router = ReplicaRouter()
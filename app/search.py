@@ -0,0 +1,180 @@
+from collections import OrderedDict
+import re
+
+from sqlalchemy import DDL, String, bindparam, desc, event, func, inspect, literal_column, select, table, union_all
+
+from app import db
+from app.models import Event, Product
+
+# name -> (model, [(column, weight)]); weights go from A (most relevant) to D.
+# The columns are indexed by the Postgres triggers and SQLite FTS5 tables
+# created below.
+SEARCHABLE = OrderedDict([
+    ('products', (Product, [('name', 'A'), ('country', 'B'), ('description', 'C')])),
+    ('events', (Event, [('title', 'A'), ('description', 'C')]))
+])
+
+# Postgres text search configuration: Portuguese stemming and stop words
+CONFIG = 'portuguese'
+
+# FTS5 bm25() weight for each Postgres weight
+FTS_WEIGHTS = {'A': 10.0, 'B': 5.0, 'C': 1.0, 'D': 0.5}
+
+TERMS = re.compile(r'\w+', re.UNICODE)
+
+# The statements only depend on the dialect and the tables searched
+_statements = {}
+_compiled = {}
+
+
+def search(q, tables, offset=0, limit=20):
+    # [(table name, id, rank)] of the rows matching every word of `q`, best
+    # first. Words match as prefixes, so "cerv" finds "cervejas"; Postgres
+    # also stems them. Ranks are only comparable within one database.
+    terms = terms_of(q)
+    if not terms:
+        return []
+
+    connection = db.session.connection().execution_options(compiled_cache=_compiled)
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        query = ' & '.join(term + ':*' for term in terms)
+    elif dialect == 'sqlite':
+        query = ' '.join('"{}"*'.format(term) for term in terms)
+    else:
+        raise NotImplementedError('Search needs Postgres or SQLite, not {}'.format(dialect))
+
+    key = (dialect, tuple(tables))
+    if key not in _statements:
+        _statements[key] = _statement(dialect, tables)
+    return connection.execute(_statements[key], query=query, offset=offset, limit=limit).fetchall()
+
+
+def terms_of(q):
+    # Only letters, digits and underscores reach the query syntax
+    return [term.lower() for term in TERMS.findall(q or '')]
+
+
+def _statement(dialect, tables):
+    selects = []
+    for name in tables:
+        model, columns = SEARCHABLE[name]
+        source = model.__table__
+        if dialect == 'postgresql':
+            query = func.to_tsquery(literal_column("'{}'::regconfig".format(CONFIG)), bindparam('query', type_=String))
+            vector = literal_column('{}.search_vector'.format(source.name))
+            selects.append(select([
+                literal_column("'{}'".format(name), String).label('type'),
+                source.c.id.label('id'),
+                func.ts_rank(vector, query).label('rank')
+            ]).where(vector.op('@@')(query)))
+        else:
+            fts = '{}_fts'.format(source.name)
+            weights = ', '.join(str(FTS_WEIGHTS[weight]) for _, weight in columns)
+            selects.append(select([
+                literal_column("'{}'".format(name), String).label('type'),
+                literal_column('{}.rowid'.format(fts)).label('id'),
+                # bm25() is lower for better matches
+                literal_column('-bm25({}, {})'.format(fts, weights)).label('rank')
+            ]).select_from(table(fts)).where(
+                literal_column(fts).op('MATCH')(bindparam('query', type_=String))
+            ))
+
+    statement = selects[0] if len(selects) == 1 else union_all(*selects)
+    return statement.order_by(desc(literal_column('rank')), literal_column('type'), literal_column('id')) \
+        .offset(bindparam('offset')).limit(bindparam('limit'))
+
+
+############# Index DDL #############
+
+def _postgresql_ddl(table_name, columns):
+    vector = ' || '.join(
+        "setweight(to_tsvector('{}', coalesce(NEW.{}, '')), '{}')".format(CONFIG, column, weight)
+        for column, weight in columns
+    )
+    names = ', '.join(column for column, _ in columns)
+    return [
+        'ALTER TABLE {0} ADD COLUMN search_vector tsvector'.format(table_name),
+        # A trigger rather than a generated column, which needs Postgres 12
+        'CREATE OR REPLACE FUNCTION {0}_search_vector() RETURNS trigger AS $$ '
+        'BEGIN NEW.search_vector := {1}; RETURN NEW; END $$ LANGUAGE plpgsql'.format(table_name, vector),
+        'CREATE TRIGGER {0}_search_vector BEFORE INSERT OR UPDATE OF {1} ON {0} '
+        'FOR EACH ROW EXECUTE PROCEDURE {0}_search_vector()'.format(table_name, names),
+        'CREATE INDEX ix_{0}_search_vector ON {0} USING GIN (search_vector)'.format(table_name)
+    ]
+
+
+def _sqlite_ddl(table_name, columns):
+    # An external content FTS5 table: the text stays in `table_name` and the
+    # triggers keep the index in step with it
+    names = ', '.join(column for column, _ in columns)
+    new = ', '.join('new.{}'.format(column) for column, _ in columns)
+    old = ', '.join('old.{}'.format(column) for column, _ in columns)
+    insert = 'INSERT INTO {0}_fts(rowid, {1}) VALUES (new.id, {2});'.format(table_name, names, new)
+    delete = "INSERT INTO {0}_fts({0}_fts, rowid, {1}) VALUES ('delete', old.id, {2});".format(table_name, names, old)
+    return [
+        "CREATE VIRTUAL TABLE {0}_fts USING fts5({1}, content='{0}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 1')".format(table_name, names),
+        'CREATE TRIGGER {0}_fts_insert AFTER INSERT ON {0} BEGIN {1} END'.format(table_name, insert),
+        'CREATE TRIGGER {0}_fts_delete AFTER DELETE ON {0} BEGIN {1} END'.format(table_name, delete),
+        # Only the indexed columns: counter and updated_at writes leave the
+        # index alone
+        'CREATE TRIGGER {0}_fts_update AFTER UPDATE OF {1} ON {0} BEGIN {2} {3} END'.format(
+            table_name, names, delete, insert)
+    ]
+
+
+def create_index(connection):
+    # For databases built by the migrations (manage.py db upgrade) rather than
+    # db.create_all(): runs the same DDL, then indexes the existing rows.
+    # Tables that already have their index are skipped. Returns the names of
+    # the tables indexed.
+    dialect = connection.dialect.name
+    inspector = inspect(connection)
+    indexed = []
+    for model, columns in SEARCHABLE.values():
+        name = model.__tablename__
+        if dialect == 'postgresql':
+            if 'search_vector' in [column['name'] for column in inspector.get_columns(name)]:
+                continue
+            # Rewriting the first column fires the trigger on every row
+            statements = _postgresql_ddl(name, columns) + ['UPDATE {0} SET {1} = {1}'.format(name, columns[0][0])]
+        elif dialect == 'sqlite':
+            if '{}_fts'.format(name) in inspector.get_table_names():
+                continue
+            statements = _sqlite_ddl(name, columns) + ["INSERT INTO {0}_fts({0}_fts) VALUES ('rebuild')".format(name)]
+        else:
+            raise NotImplementedError('Search needs Postgres or SQLite, not {}'.format(dialect))
+        for statement in statements:
+            connection.execute(DDL(statement))
+        indexed.append(name)
+    return indexed
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Alembic autogenerate filter (manage.py): the search column, index and
+    # FTS5 tables are not declared on the models, so the migrations must
+    # neither drop nor create them
+    tables = [model.__tablename__ for model, _ in SEARCHABLE.values()]
+    if type_ == 'table':
+        return not any(name == '{}_fts'.format(source) or name.startswith('{}_fts_'.format(source))
+                       for source in tables)
+    if type_ == 'column':
+        return not (name == 'search_vector' and object.table.name in tables)
+    if type_ == 'index':
+        return name not in ['ix_{}_search_vector'.format(source) for source in tables]
+    return True
+
+
+def _listen(target, statements, dialect):
+    for statement in statements:
+        event.listen(target, 'after_create', DDL(statement).execute_if(dialect=dialect))
+
+
+# Run by db.create_all(); existing databases get the same statements from
+# db_fix.txt, and databases built by the migrations from create_index()
+for model, columns in SEARCHABLE.values():
+    _listen(model.__table__, _postgresql_ddl(model.__tablename__, columns), 'postgresql')
+    _listen(model.__table__, _sqlite_ddl(model.__tablename__, columns), 'sqlite')
+    event.listen(model.__table__, 'after_drop',
+                 DDL('DROP TABLE IF EXISTS {}_fts'.format(model.__tablename__)).execute_if(dialect='sqlite'))
@@ -0,0 +1,165 @@
+from collections import OrderedDict
+
+from flask import abort, request
+
+from app.models import User, Event, Product, Category, Like, Attend, Favourite
+
+
+class FieldSet(object):
+    # The fields a resource can return: output name -> (column, formatter).
+    # Queries select only the requested columns with with_entities() and the
+    # resulting row tuples are turned into dicts by a function generated once
+    # per combination of fields, so read paths never build ORM instances.
+
+    def __init__(self, *fields):
+        self.fields = OrderedDict((name, (column, formatter)) for name, column, formatter in fields)
+        self.names = list(self.fields)
+        self._dumpers = {}
+        self.dumper(self.names)
+
+    def extended(self, *fields):
+        return FieldSet(*([(name, column, formatter) for name, (column, formatter) in self.fields.items()] + list(fields)))
+
+    def requested(self, allowed=None):
+        # Parses ?fields=a,b,c against `allowed` (every field by default).
+        # 'id' is always returned so list pages can still be paginated.
+        allowed = list(allowed or self.names)
+        value = request.args.get('fields')
+        if not value:
+            return allowed
+
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        if any(name not in allowed for name in names):
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+        return [name for name in allowed if name == 'id' or name in names]
+
+    def select(self, query, names=None):
+        return query.with_entities(*[self.fields[name][0] for name in names or self.names])
+
+    def dump(self, row, names=None):
+        return self.dumper(names or self.names)(row)
+
+    def dump_instance(self, obj, names=None):
+        # For write paths that already hold an ORM instance
+        names = names or self.names
+        return self.dump(tuple(getattr(obj, self.fields[name][0].key) for name in names), names)
+
+    def dumper(self, names):
+        key = tuple(names)
+        dumper = self._dumpers.get(key)
+        if dumper is None:
+            dumper = self._dumpers[key] = self._compile(key)
+        return dumper
+
+    def _compile(self, names):
+        # Generates "def dump(row): return {'id': row[0], 'date': f1(row[1]), ...}"
+        namespace = {}
+        items = []
+        for index, name in enumerate(names):
+            formatter = self.fields[name][1]
+            if formatter is None:
+                items.append('{!r}: row[{}]'.format(name, index))
+            else:
+                namespace['f{}'.format(index)] = formatter
+                items.append('{!r}: f{}(row[{}])'.format(name, index, index))
+
+        exec('def dump(row):\n    return {' + ', '.join(items) + '}\n', namespace)
+        return namespace['dump']
+
+
+def format_date(value):
+    # dd-mm-yyyy, the format the app has always received for user dates
+    if value is None:
+        return None
+    return '%02d-%02d-%04d' % (value.day, value.month, value.year)
+
+
+####################################
+#        Serializer registry       #
+####################################
+
+USER_FIELDS = FieldSet(
+    ('id', User.id, None),
+    ('name', User.name, None),
+    ('email', User.email, None),
+    ('profile_pic', User.profile_pic, None),
+    ('start_date', User.start_date, format_date),
+    ('api_key', User.api_key, None)
+)
+
+# What users see about each other
+USER_PUBLIC = ['id', 'name', 'email', 'profile_pic', 'start_date']
+
+EVENT_FIELDS = FieldSet(
+    ('id', Event.id, None),
+    ('title', Event.title, None),
+    ('description', Event.description, None),
+    ('date', Event.date, str),
+    ('time', Event.time, str),
+    ('picture', Event.picture, None),
+    ('event_type', Event.event_type, None)
+)
+
+PRODUCT_FIELDS = FieldSet(
+    ('id', Product.id, None),
+    ('name', Product.name, None),
+    ('description', Product.description, None),
+    ('category_id', Product.category_id, None),
+    ('proof', Product.proof, str),
+    ('country', Product.country, None),
+    ('available', Product.available, None),
+    ('price', Product.price, str),
+    ('picture', Product.picture, None)
+)
+
+# Products ranked by how many users have them as favourite (kept by app/counters.py)
+FAVOURITE_COUNT = Product.favourite_count.label('count')
+TOP_FAVOURITE_FIELDS = PRODUCT_FIELDS.extended(('count', FAVOURITE_COUNT, None))
+
+CATEGORY_FIELDS = FieldSet(
+    ('id', Category.id, None),
+    ('name', Category.name, None),
+    ('url', Category.url, None)
+)
+
+LIKE_FIELDS = FieldSet(
+    ('id', Like.id, None),
+    ('user_id', Like.user_id, None),
+    ('event_id', Like.event_id, None)
+)
+
+ATTEND_FIELDS = FieldSet(
+    ('id', Attend.id, None),
+    ('user_id', Attend.user_id, None),
+    ('event_id', Attend.event_id, None),
+    ('will_go', Attend.will_go, None)
+)
+
+# Attends joined with their user
+ATTEND_DETAIL_FIELDS = FieldSet(
+    ('id', Attend.id, None),
+    ('user_id', Attend.user_id, None),
+    ('event_id', Attend.event_id, None),
+    ('name', User.name, None),
+    ('profile_pic', User.profile_pic, None),
+    ('will_go', Attend.will_go, None)
+)
+
+FAVOURITE_FIELDS = FieldSet(
+    ('id', Favourite.id, None),
+    ('user_id', Favourite.user_id, None),
+    ('product_id', Favourite.product_id, None)
+)
+
+# Favourites joined with their user and product
+FAVOURITE_DETAIL_FIELDS = FieldSet(
+    ('id', Favourite.id, None),
+    ('user_id', Favourite.user_id, None),
+    ('user_name', User.name, None),
+    ('user_email', User.email, None),
+    ('user_pic', User.profile_pic, None),
+    ('product_id', Favourite.product_id, None),
+    ('product_name', Product.name, None),
+    ('product_pic', Product.picture, None)
+)
@@ -0,0 +1,195 @@
+from collections import deque
+from threading import Lock, Thread
+from uuid import uuid4
+import json
+import logging
+import select
+import time
+
+from six.moves.queue import Queue, Empty, Full
+from sqlalchemy import event, text
+from sqlalchemy.engine.url import make_url
+
+from app import db
+from app.models import Event, Product, Category
+from app.routing import RoutingSession
+
+logger = logging.getLogger('app.stream')
+
+
+class Broker(object):
+    # Fans out change notifications to the clients connected to
+    # GET /api/v1/stream/ (Server-Sent Events):
+    #
+    #   event.created / event.updated / event.deleted   {"id", "event_type"}
+    #   catalog.updated                                  {"table", "id", "action"}
+    #   reset                                            refetch, something was missed
+    #
+    # Notifications are published once the transaction that made the change
+    # commits. With STREAM_BACKEND = 'memory' (the default) they only reach
+    # clients of the same process. With 'postgres' they go through
+    # NOTIFY/LISTEN on STREAM_CHANNEL, so every worker gets every change.
+    # The listening connection is opened to STREAM_DATABASE_URI (the main
+    # database by default), which must not go through PgBouncer transaction
+    # pooling.
+    #
+    # The last STREAM_HISTORY notifications are kept so that a client
+    # reconnecting with Last-Event-ID gets what it missed; if its id is too
+    # old it gets "reset" instead. Clients that fall STREAM_QUEUE_SIZE
+    # notifications behind are disconnected.
+
+    def __init__(self, history=100, queue_size=100, heartbeat=15, max_seconds=600):
+        self.backend = 'memory'
+        self.channel = 'habituate_stream'
+        self.uri = None
+        self.heartbeat = heartbeat
+        self.max_seconds = max_seconds
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._listener = None
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.backend = app.config.get('STREAM_BACKEND', self.backend)
+        self.channel = app.config.get('STREAM_CHANNEL', self.channel)
+        self.uri = app.config.get('STREAM_DATABASE_URI') or app.config.get('SQLALCHEMY_DATABASE_URI')
+        self.heartbeat = app.config.get('STREAM_HEARTBEAT', self.heartbeat)
+        self.max_seconds = app.config.get('STREAM_MAX_SECONDS', self.max_seconds)
+        self.queue_size = app.config.get('STREAM_QUEUE_SIZE', self.queue_size)
+        self._history = deque(self._history, maxlen=app.config.get('STREAM_HISTORY', self._history.maxlen))
+
+        if not event.contains(RoutingSession, 'after_flush', _collect):
+            event.listen(RoutingSession, 'after_flush', _collect)
+            event.listen(RoutingSession, 'after_commit', _publish)
+            event.listen(RoutingSession, 'after_soft_rollback', _discard)
+
+    def publish(self, name, data):
+        message = {'id': uuid4().hex, 'event': name, 'data': data}
+        if self.backend == 'postgres':
+            # Delivered to every listening worker, this one included
+            connection = db.engine.connect().execution_options(autocommit=True)
+            try:
+                connection.execute(text('SELECT pg_notify(:channel, :payload)'),
+                                   channel=self.channel, payload=json.dumps(message))
+            finally:
+                connection.close()
+        else:
+            self.deliver(message)
+
+    def deliver(self, message):
+        with self._lock:
+            self._history.append(message)
+            for queue in list(self._subscribers):
+                try:
+                    queue.put_nowait(message)
+                except Full:
+                    # Too slow; its stream sends "reset" and ends
+                    self._subscribers.discard(queue)
+
+    def stream(self, last_event_id=None):
+        # The SSE body. Holds no database connection, only a queue.
+        queue = Queue(self.queue_size)
+        with self._lock:
+            backlog = self._backlog(last_event_id)
+            self._subscribers.add(queue)
+        if self.backend == 'postgres':
+            self._start_listener()
+
+        def generate():
+            started = time.time()
+            try:
+                yield 'retry: 5000\n\n'
+                for message in backlog:
+                    yield format_message(message)
+
+                while not self.max_seconds or time.time() - started < self.max_seconds:
+                    try:
+                        message = queue.get(timeout=self.heartbeat)
+                    except Empty:
+                        if queue not in self._subscribers:
+                            yield format_message({'event': 'reset', 'data': {}})
+                            return
+                        # Comments keep proxies from closing an idle connection
+                        yield ': keepalive\n\n'
+                        continue
+                    yield format_message(message)
+            finally:
+                with self._lock:
+                    self._subscribers.discard(queue)
+        return generate()
+
+    def _backlog(self, last_event_id):
+        if not last_event_id:
+            return []
+        ids = [message['id'] for message in self._history]
+        if last_event_id in ids:
+            return list(self._history)[ids.index(last_event_id) + 1:]
+        return [{'event': 'reset', 'data': {}}]
+
+    def _start_listener(self):
+        # One per process, started by the first client so that it runs in
+        # the gunicorn worker rather than in the master
+        with self._lock:
+            if self._listener is None:
+                self._listener = Thread(target=self._listen)
+                self._listener.daemon = True
+                self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        url = make_url(self.uri)
+        while True:
+            try:
+                connection = psycopg2.connect(**url.translate_connect_args(username='user', database='dbname'))
+                connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                connection.cursor().execute('LISTEN "{}"'.format(self.channel))
+                while True:
+                    if select.select([connection], [], [], 5) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self.deliver(json.loads(connection.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Stream listener lost its connection')
+                # Notifications sent meanwhile are lost
+                self.deliver({'id': uuid4().hex, 'event': 'reset', 'data': {}})
+                time.sleep(1)
+
+
+def format_message(message):
+    lines = []
+    if message.get('id'):
+        lines.append('id: {}'.format(message['id']))
+    lines.append('event: {}'.format(message['event']))
+    lines.append('data: {}'.format(json.dumps(message['data'])))
+    return '\n'.join(lines) + '\n\n'
+
+
+############# Session events #############
+
+def _collect(session, flush_context):
+    # Ids are known after the flush; publishing waits for the commit
+    pending = session.info.setdefault('stream', [])
+    for action, objects in (('created', session.new), ('updated', session.dirty), ('deleted', session.deleted)):
+        for obj in objects:
+            if action == 'updated' and not session.is_modified(obj):
+                continue
+            if isinstance(obj, Event):
+                pending.append(('event.' + action, {'id': obj.id, 'event_type': obj.event_type}))
+            elif isinstance(obj, (Product, Category)):
+                pending.append(('catalog.updated', {'table': obj.__tablename__, 'id': obj.id, 'action': action}))
+
+
+def _publish(session):
+    for name, data in session.info.pop('stream', []):
+        broker.publish(name, data)
+
+
+def _discard(session, previous_transaction):
+    session.info.pop('stream', None)
+
+
+broker = Broker()
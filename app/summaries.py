@@ -0,0 +1,79 @@
+from collections import OrderedDict
+
+from sqlalchemy import String, and_, bindparam, func, literal_column, select, union_all
+
+from app import db
+from app.models import Event, Attend, User, EventAttendCount
+
+events = Event.__table__
+attends = Attend.__table__
+attend_counts = EventAttendCount.__table__
+users = User.__table__
+
+EVENT_IDS = bindparam('ids', expanding=True)
+
+# Primary key reads of the counters kept by app/counters.py: one row per
+# existing event with its like count and one per will_go with attends
+#
+#   event_id | kind       | count
+#   ---------+------------+------
+#          3 | :likes     |    40
+#          3 | going      |    12
+COUNTS = union_all(
+    select([events.c.id, literal_column("':likes'", String), events.c.like_count])
+    .where(events.c.id.in_(EVENT_IDS)),
+    select([attend_counts.c.event_id, attend_counts.c.will_go, attend_counts.c.count])
+    .where(and_(attend_counts.c.event_id.in_(EVENT_IDS), attend_counts.c.count > 0))
+)
+
+# The first :preview attendees (by attend id) of each will_go group; only
+# the user's id, name and picture
+RANKED = select([
+    attends.c.event_id,
+    attends.c.will_go,
+    attends.c.user_id,
+    func.row_number().over(partition_by=(attends.c.event_id, attends.c.will_go), order_by=attends.c.id).label('rank')
+]).where(and_(attends.c.event_id.in_(EVENT_IDS), attends.c.will_go.isnot(None))).alias('ranked')
+
+PREVIEW = select([RANKED.c.event_id, RANKED.c.will_go, users.c.id, users.c.name, users.c.profile_pic]) \
+    .select_from(RANKED.join(users, users.c.id == RANKED.c.user_id)) \
+    .where(RANKED.c.rank <= bindparam('preview')) \
+    .order_by(RANKED.c.event_id, RANKED.c.will_go, RANKED.c.rank)
+
+# The statements never change, so each dialect compiles them once
+_compiled = {}
+
+
+def event_summaries(ids, preview=0):
+    # Attendance counts per will_go value and like totals for the events in
+    # `ids`, keyed by event id in the order given; ids with no event are left
+    # out. One query, plus one more for the attendee previews when `preview`
+    # is set.
+    ids = list(ids)
+    if not ids:
+        return OrderedDict()
+
+    connection = db.session.connection().execution_options(compiled_cache=_compiled)
+
+    summaries = {}
+    counts = []
+    for event_id, kind, count in connection.execute(COUNTS, ids=ids):
+        if kind == ':likes':
+            summaries[event_id] = {'event_id': event_id, 'likes': count, 'attends': {}}
+        else:
+            counts.append((event_id, kind, count))
+
+    for event_id, will_go, count in counts:
+        if event_id in summaries:
+            summaries[event_id]['attends'][will_go] = count
+
+    if preview and summaries:
+        for summary in summaries.values():
+            summary['preview'] = {}
+
+        for event_id, will_go, user_id, name, profile_pic in connection.execute(
+                PREVIEW, ids=list(summaries), preview=preview):
+            summaries[event_id]['preview'].setdefault(will_go, []).append(
+                {'id': user_id, 'name': name, 'profile_pic': profile_pic})
+
+    return OrderedDict((event_id, summaries[event_id]) for event_id in ids if event_id in summaries)
@@ -0,0 +1,72 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import calendar
+
+from app import db
+from app.models import Event, Product, Category, Like, Attend, Favourite, Tombstone
+from app.serializers import EVENT_FIELDS, PRODUCT_FIELDS, CATEGORY_FIELDS, LIKE_FIELDS, ATTEND_FIELDS, \
+    FAVOURITE_FIELDS
+
+# name -> (model, fields, column holding the owner's user id)
+ENTITIES = OrderedDict([
+    ('categories', (Category, CATEGORY_FIELDS, None)),
+    ('products', (Product, PRODUCT_FIELDS, None)),
+    ('events', (Event, EVENT_FIELDS, None)),
+    ('favourites', (Favourite, FAVOURITE_FIELDS, 'user_id')),
+    ('likes', (Like, LIKE_FIELDS, 'user_id')),
+    ('attends', (Attend, ATTEND_FIELDS, 'user_id'))
+])
+
+DEFAULT_ENTITIES = ['categories', 'products', 'events', 'favourites']
+
+
+def changes(entities, since, principal, overlap=5, tombstone_days=90):
+    # Rows of `entities` created or updated after `since` (a naive UTC
+    # datetime) and the ids deleted since then. Users only get their own
+    # favourites, likes and attends, and only their own deletions of them.
+    #
+    # `until` is what the client sends as ?since= next time. It lags the
+    # clock by `overlap` seconds so that rows committed by slower
+    # transactions are not skipped; those rows are simply sent twice.
+    #
+    # Without `since`, or when it is older than the tombstones kept
+    # (`tombstone_days`), everything is sent with "full": true and the
+    # client replaces what it has.
+    now = datetime.utcnow()
+    full = since is None or since < now - timedelta(days=tombstone_days)
+
+    results = OrderedDict()
+    deleted = OrderedDict()
+    for name in entities:
+        model, fields, owner = ENTITIES[name]
+        query = model.query
+        if owner and principal.role == 'user':
+            query = query.filter(getattr(model, owner) == principal.id)
+        if not full:
+            query = query.filter(model.updated_at > since)
+
+        rows = [fields.dump(row) for row in fields.select(query.order_by(model.id))]
+        if rows:
+            results[name] = rows
+
+        if not full:
+            tombstones = db.session.query(Tombstone.row_id).filter(
+                Tombstone.table_name == model.__tablename__, Tombstone.deleted_at > since)
+            if owner and principal.role == 'user':
+                tombstones = tombstones.filter(Tombstone.user_id == principal.id)
+            ids = [row_id for row_id, in tombstones]
+            if ids:
+                deleted[name] = ids
+
+    # Empty sections are left out, so an idle sync is a few bytes
+    return {
+        'until': timestamp(now - timedelta(seconds=overlap)),
+        'full': full,
+        'changes': results,
+        'deleted': deleted
+    }
+
+
+def timestamp(value):
+    # Seconds since the epoch, as sent back in ?since=
+    return calendar.timegm(value.utctimetuple()) + value.microsecond / 1e6
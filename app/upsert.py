@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from sqlalchemy import and_, literal_column, tuple_
+from sqlalchemy.dialects import postgresql
+
+from app import db
+from app.counters import counters
+
+
+def upsert(model, values, index_elements, update=()):
+    # Inserts one row, or finds the row already holding the same values in the
+    # unique index over `index_elements` and sets the `update` columns on it.
+    # Returns (row, inserted). Nothing is committed.
+    return upsert_many(model, [values], index_elements, update)[0]
+
+
+def upsert_many(model, rows, index_elements, update=()):
+    # Same as upsert() for several rows, whose keys must be distinct.
+    # Returns a list of (row, inserted) in the order of `rows`.
+    if not rows:
+        return []
+
+    table = model.__table__
+    dialect = db.session.get_bind(mapper=model.__mapper__).dialect.name
+
+    # Core statements do not fire the mapper events that keep the counters
+    existing = counters.existing(model, rows, index_elements, update)
+    if dialect == 'postgresql':
+        results = _upsert_postgresql(table, rows, index_elements, update)
+    else:
+        results = _upsert_generic(table, rows, index_elements, update)
+    counters.upserted(model, existing, results, index_elements)
+    return results
+
+
+def _upsert_postgresql(table, rows, index_elements, update):
+    # INSERT ... ON CONFLICT ... RETURNING, one round trip for all rows.
+    # Without `update` it is DO NOTHING, so existing rows are not written
+    # again; RETURNING then leaves them out and one more SELECT finds them.
+    stmt = postgresql.insert(table).values(rows)
+    if update:
+        set_ = dict((column, stmt.excluded[column]) for column in update)
+        if 'updated_at' in table.c:
+            # ON CONFLICT DO UPDATE does not apply onupdate defaults
+            set_['updated_at'] = datetime.utcnow()
+        stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+    # xmax is only 0 on a freshly inserted tuple
+    stmt = stmt.returning(*(list(table.c) + [literal_column('xmax = 0').label('inserted')]))
+
+    returned = dict(
+        (_key(row, index_elements), (row, row['inserted']))
+        for row in db.session.execute(stmt)
+    )
+    missing = [_key(values, index_elements) for values in rows if _key(values, index_elements) not in returned]
+    if missing:
+        columns = tuple_(*[table.c[column] for column in index_elements])
+        for row in db.session.execute(table.select().where(columns.in_(missing))):
+            returned[_key(row, index_elements)] = (row, False)
+    return [returned[_key(values, index_elements)] for values in rows]
+
+
+def _upsert_generic(table, rows, index_elements, update):
+    # Fallback for SQLite and other backends without ON CONFLICT support in
+    # this SQLAlchemy version; runs inside the caller's transaction
+    results = []
+    for values in rows:
+        where = and_(*[table.c[column] == values[column] for column in index_elements])
+        inserted = db.session.execute(table.select().where(where)).first() is None
+
+        if inserted:
+            db.session.execute(table.insert().values(**values))
+        elif update:
+            db.session.execute(table.update().where(where).values(
+                **dict((column, values[column]) for column in update)
+            ))
+
+        results.append((db.session.execute(table.select().where(where)).first(), inserted))
+    return results
+
+
+def _key(row, index_elements):
+    return tuple(row[column] for column in index_elements)
@@ -0,0 +1,109 @@
+from functools import wraps
+from threading import Lock
+import hashlib
+import time
+
+from flask import current_app, request
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.compression import encoded_etags
+from app.encoding import negotiated_renderer
+
+
+class TableVersions(object):
+    # Change counters per table, shared by every worker through the
+    # table_versions table. Models bump them from save()/delete() inside the
+    # same transaction as the change; readers use a snapshot of the whole
+    # table that is refreshed at most once every TABLE_VERSION_TTL seconds.
+
+    def __init__(self, ttl=1):
+        self.ttl = ttl
+        self._snapshot = {}
+        self._expires = 0
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get('TABLE_VERSION_TTL', self.ttl)
+
+    def touch(self, *tables):
+        # Prevents circular imports
+        from app.models import TableVersion
+
+        versions = TableVersion.__table__
+        for table in tables:
+            result = db.session.execute(
+                versions.update().where(versions.c.name == table).values(version=versions.c.version + 1)
+            )
+            if result.rowcount == 0:
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(versions.insert().values(name=table, version=1))
+                except IntegrityError:
+                    # Another transaction created the row first
+                    db.session.execute(
+                        versions.update().where(versions.c.name == table).values(version=versions.c.version + 1)
+                    )
+        self._expires = 0
+
+    def get(self, *tables):
+        if self._expires <= time.time():
+            self._reload()
+        return tuple(self._snapshot.get(table, 0) for table in tables)
+
+    def _reload(self):
+        # Prevents circular imports
+        from app.models import TableVersion
+
+        with self._lock:
+            rows = db.session.query(TableVersion.name, TableVersion.version).all()
+            self._snapshot = dict(rows)
+            self._expires = time.time() + self.ttl
+
+
+def conditional(tables, policy=None, vary=None):
+    # Answers GET requests with a strong ETag derived from the versions of
+    # `tables`, and with 304 Not Modified when If-None-Match matches it, in
+    # which case the view is never called. `vary` can return anything else the
+    # body depends on. `policy` names an entry of CACHE_CONTROL_POLICIES.
+    def decorator(view_function):
+        @wraps(view_function)
+        def decorated_function(*args, **kwargs):
+            etag = make_etag(tables, vary() if vary else None)
+
+            if any(request.if_none_match.contains(tag) for tag in encoded_etags(etag)):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view_function(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            cache_control = current_app.config.get('CACHE_CONTROL_POLICIES', DEFAULT_POLICIES).get(policy)
+            if cache_control:
+                response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
+
+
+def make_etag(tables, extra=None):
+    key = repr((
+        request.endpoint,
+        sorted(request.view_args.items()),
+        sorted(request.args.items(multi=True)),
+        negotiated_renderer().media_type,
+        table_versions.get(*tables),
+        extra
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# The API requires a key, so shared caches must not store responses;
+# no-cache lets the app keep its copy and revalidate it with If-None-Match
+DEFAULT_POLICIES = {
+    'catalog': 'private, no-cache',
+    'events': 'private, no-cache'
+}
+
+table_versions = TableVersions()
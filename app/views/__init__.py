@@ -0,0 +1,24 @@
+from importlib import import_module
+
+# One blueprint per resource, each in the module of the same name. The
+# modules are imported by register_blueprints(), not by `import app`, so
+# scripts that only need the models and db do not load every view.
+BLUEPRINTS = (
+    'tokens',
+    'users',
+    'events',
+    'products',
+    'categories',
+    'likes',
+    'attends',
+    'favourites',
+    'search',
+    'sync',
+    'stream',
+    'health'
+)
+
+
+def register_blueprints(app):
+    for name in BLUEPRINTS:
+        app.register_blueprint(import_module('app.views.' + name).bp)
@@ -0,0 +1,162 @@
+from flask import Blueprint, request, abort, current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.auth import require_api_key
+from app.batch import apply_batch
+from app.encoding import jsonify
+from app.models import Attend, User
+from app.pagination import list_response
+from app.serializers import ATTEND_FIELDS, ATTEND_DETAIL_FIELDS
+from app.upsert import upsert
+
+####################################
+#      Attend related endpoints    #
+####################################
+
+bp = Blueprint('attends', __name__)
+
+
+@bp.route('/api/v1/attends/', methods=['GET'])
+@require_api_key
+def get_attends():
+    if request.method == 'GET':
+        return list_response(ATTEND_FIELDS.select(Attend.query), Attend.id, ATTEND_FIELDS.dump)
+
+
+@bp.route('/api/v1/attends/all/', methods=['GET'])
+@require_api_key
+def get_attends_all():
+    if request.method == 'GET':
+
+        join = db.session.query(Attend).join(User, User.id==Attend.user_id)
+
+        return list_response(ATTEND_DETAIL_FIELDS.select(join), Attend.id, ATTEND_DETAIL_FIELDS.dump)
+
+
+@bp.route('/api/v1/attends/<string:category>/', methods=['GET'])
+@require_api_key
+def get_attends_by_category(category, **kwargs):
+    if request.method == 'GET':
+
+        join = db.session.query(Attend).join(User, User.id==Attend.user_id).filter(Attend.will_go==category)
+
+        results = []
+
+        for attend in ATTEND_DETAIL_FIELDS.select(join):
+            results.append(ATTEND_DETAIL_FIELDS.dump(attend))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/attends/event/<int:id>/<string:category>/', methods=['GET'])
+@require_api_key
+def get_attends_by_category_and_event_id(id, category, **kwargs):
+    if request.method == 'GET':
+
+        join = db.session.query(Attend).join(User, User.id==Attend.user_id).filter(Attend.event_id==id).filter(Attend.will_go==category)
+
+        results = []
+
+        for attend in ATTEND_DETAIL_FIELDS.select(join):
+            results.append(ATTEND_DETAIL_FIELDS.dump(attend))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/attends/event/<int:id>/all/', methods=['GET'])
+@require_api_key
+def get_all_attends_by_event_id(id, **kwargs):
+    if request.method == 'GET':
+
+        join = db.session.query(Attend).join(User, User.id==Attend.user_id).filter(Attend.event_id==id)
+
+        results = []
+
+        for attend in ATTEND_DETAIL_FIELDS.select(join):
+            results.append(ATTEND_DETAIL_FIELDS.dump(attend))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/attends/', methods=['PUT'])
+@require_api_key
+def post_attend():
+    if request.method == 'PUT':
+        user_id = request.args.get('user_id', type=int)
+        event_id = request.args.get('event_id', type=int)
+        will_go = request.args.get('will_go')
+
+        if user_id and event_id and will_go:
+            attend, inserted = upsert(Attend, {'user_id': user_id, 'event_id': event_id, 'will_go': will_go},
+                                      ('user_id', 'event_id'), update=('will_go',))
+            db.session.commit()
+
+            Response = jsonify(ATTEND_FIELDS.dump_instance(attend))
+            Response.status_code = 201 if inserted else 200
+            return Response
+        else:
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+
+@bp.route('/api/v1/attends/<int:id>/', methods=['PUT'])
+@require_api_key
+def put_attend(id, **kwargs):
+    if request.method == 'PUT':
+        status = 0
+        attend = Attend.query.filter_by(id=id).first()
+        user_id = request.args.get('user_id', type=int)
+        event_id = request.args.get('event_id', type=int)
+        will_go = request.args.get('will_go')
+
+        if not attend:
+            if user_id and event_id and will_go:
+                attend, inserted = upsert(Attend, {'user_id': user_id, 'event_id': event_id, 'will_go': will_go},
+                                          ('user_id', 'event_id'), update=('will_go',))
+                db.session.commit()
+                status = 201 if inserted else 200
+            else:
+                abort(400)
+        else:
+            if user_id is not None:
+                attend.user_id = user_id
+            if event_id is not None:
+                attend.event_id = event_id
+            if will_go is not None:
+                attend.will_go = will_go
+            try:
+                attend.save()
+            except IntegrityError:
+                # Moved onto a (user, event) pair that already has an attend
+                db.session.rollback()
+                # Raise an HTTPException with a 409 conflict status code
+                abort(409)
+            status = 200
+
+        Response = jsonify(ATTEND_FIELDS.dump_instance(attend))
+        Response.status_code = status
+        return Response
+
+
+@bp.route('/api/v1/attends/batch/', methods=['POST'])
+@require_api_key
+def post_attends_batch():
+    if request.method == 'POST': # POST method
+        items = request.data
+        if not isinstance(items, list) or len(items) > current_app.config.get('BATCH_MAX_ITEMS', 500):
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+        results = apply_batch(Attend, items, ('user_id', 'event_id'), ('will_go',))
+        db.session.commit()
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
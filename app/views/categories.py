@@ -0,0 +1,118 @@
+from flask import Blueprint, request, abort
+
+from app.auth import require_api_key, require_admin_key
+from app.cache import catalog_cache
+from app.encoding import jsonify
+from app.models import Category, Product
+from app.serializers import CATEGORY_FIELDS, PRODUCT_FIELDS
+from app.versions import conditional
+
+####################################
+#    Category related endpoints    #
+####################################
+
+bp = Blueprint('categories', __name__)
+
+
+@bp.route('/api/v1/categories/', methods=['GET'])
+@require_api_key
+@conditional(('products', 'categories'), policy='catalog')
+@catalog_cache.cached
+def get_categories():
+    if request.method == 'GET': # GET method
+        categories = CATEGORY_FIELDS.select(Category.query)
+        results = []
+
+        for category in categories:
+            results.append(CATEGORY_FIELDS.dump(category))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/categories/', methods=['POST'])
+@require_admin_key
+def post_category():
+    if request.method == 'POST': # POST method
+        name = request.values.get('name')
+        url = request.values.get('url')
+
+        if name and url:
+            category = Category(name=name, url=url)
+            category.save()
+            catalog_cache.bump()
+
+            Response = jsonify(CATEGORY_FIELDS.dump_instance(category))
+            Response.status_code = 201
+            return Response
+
+
+@bp.route('/api/v1/categories/<int:id>/', methods=['GET'])
+@require_api_key
+@conditional(('products', 'categories'), policy='catalog')
+@catalog_cache.cached
+def get_category_by_id(id, **kwargs):
+    category = CATEGORY_FIELDS.select(Category.query.filter_by(id=id)).first()
+    if not category:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        Response = jsonify(CATEGORY_FIELDS.dump(category))
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/categories/<int:id>/', methods=['PUT', 'DELETE'])
+@require_admin_key
+def categories_manipulation(id, **kwargs):
+    category = Category.query.filter_by(id=id).first()
+    if not category:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # DELETE method
+    if request.method == 'DELETE':
+        Category.delete(category)
+        catalog_cache.bump()
+        return {
+            'message' : "Category {} deleted successfully.".format(category.id)
+        }
+    # PUT method
+    elif request.method == 'PUT':
+        name = request.values.get('name')
+        url = request.values.get('url')
+
+        if name is not None:
+            category.name = name
+        if url is not None:
+            category.url = url
+        category.save()
+        catalog_cache.bump()
+
+        Response = jsonify(CATEGORY_FIELDS.dump_instance(category))
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/products/category/<int:id>', methods=['GET'])
+@require_api_key
+@conditional(('products', 'categories'), policy='catalog')
+@catalog_cache.cached
+def get_products_by_category(id, **kwargs):
+    category = Category.query.with_entities(Category.id).filter_by(id=id).first()
+    results = []
+    if not category:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        fields = PRODUCT_FIELDS.requested()
+        products = PRODUCT_FIELDS.select(Product.query.filter_by(category_id=id), fields)
+
+        for product in products:
+            results.append(PRODUCT_FIELDS.dump(product, fields))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
@@ -0,0 +1,210 @@
+from collections import OrderedDict
+from datetime import date
+
+from flask import Blueprint, request, abort, current_app
+
+from app.auth import require_api_key, require_admin_key
+from app.encoding import jsonify
+from app.models import Event
+from app.pagination import list_response
+from app.serializers import EVENT_FIELDS
+from app.summaries import event_summaries
+from app.versions import conditional
+
+####################################
+#      Event related endpoints     #
+####################################
+
+bp = Blueprint('events', __name__)
+
+
+@bp.route('/api/v1/events/', methods=['GET'])
+@require_admin_key
+@conditional(('events',), policy='events')
+def get_events():
+    if request.method == 'GET': # GET method
+        fields = EVENT_FIELDS.requested()
+
+        def serialize(event):
+            return EVENT_FIELDS.dump(event, fields)
+
+        return list_response(EVENT_FIELDS.select(Event.query, fields), Event.id, serialize)
+
+
+@bp.route('/api/v1/events/news/', methods=['GET'])
+@require_api_key
+@conditional(('events',), policy='events')
+def get_news():
+    if request.method == 'GET': # GET method
+        fields = EVENT_FIELDS.requested()
+        events = EVENT_FIELDS.select(Event.query.filter_by(event_type='news').order_by(Event.date.desc()), fields)
+        results = []
+
+        for event in events:
+            results.append(EVENT_FIELDS.dump(event, fields))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/events/event/', methods=['GET'])
+@require_api_key
+@conditional(('events',), policy='events', vary=date.today)
+def get_filtered_events():
+    if request.method == 'GET': # GET method
+        fields = EVENT_FIELDS.requested()
+        events = EVENT_FIELDS.select(Event.query.filter(Event.event_type == 'event', Event.date > date.today()).order_by(Event.date.asc()), fields)
+        results = []
+
+        for event in events:
+            results.append(EVENT_FIELDS.dump(event, fields))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/events/event/all/', methods=['GET'])
+@require_api_key
+@conditional(('events',), policy='events')
+def get_all_events():
+    if request.method == 'GET': # GET method
+        fields = EVENT_FIELDS.requested()
+        events = EVENT_FIELDS.select(Event.query.filter_by(event_type='event').order_by(Event.date.desc()), fields)
+        results = []
+
+        for event in events:
+            results.append(EVENT_FIELDS.dump(event, fields))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/events/', methods=['POST'])
+@require_admin_key
+def post_events():
+    if request.method == 'POST': # POST method
+        title = request.values.get('title')
+        description = request.values.get('description')
+        date = request.values.get('date')
+        time = request.values.get('time')
+        picture = request.values.get('picture')
+        event_type = request.values.get('event_type')
+
+        if title and description:
+            event = Event(title=title, description=description, date=date, time=time, picture=picture, event_type=event_type)
+            event.save()
+
+            Response = jsonify(EVENT_FIELDS.dump_instance(event))
+
+            Response.status_code = 201
+            return Response
+        else:
+            abort(400) # Raise an HTTPException with a 400 bad request status code
+
+
+@bp.route('/api/v1/events/<int:id>/', methods=['GET'])
+@require_api_key
+@conditional(('events',), policy='events')
+def get_event_by_id(id, **kwargs):
+    fields = EVENT_FIELDS.requested()
+    event = EVENT_FIELDS.select(Event.query.filter_by(id=id), fields).first()
+    if not event:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        Response = jsonify(EVENT_FIELDS.dump(event, fields))
+
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/events/<int:id>/summary/', methods=['GET'])
+@require_api_key
+def get_event_summary(id, **kwargs):
+    if request.method == 'GET': # GET method
+        summaries = event_summaries([id], preview=summary_preview())
+        if not summaries:
+            # Raise an HTTPException with a 404 not found status code
+            abort(404)
+
+        Response = jsonify(summaries[id])
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/events/summary/', methods=['GET'])
+@require_api_key
+def get_event_summaries():
+    if request.method == 'GET': # GET method
+        # ?ids=1,2,3 for a whole screen of event cards in one request
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        except ValueError:
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+        if not ids or len(ids) > current_app.config.get('EVENT_SUMMARY_MAX_IDS', 100):
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+        summaries = event_summaries(OrderedDict.fromkeys(ids), preview=summary_preview())
+
+        Response = jsonify(list(summaries.values()))
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/events/<int:id>/', methods=['PUT', 'DELETE'])
+@require_admin_key
+def event_manipulation(id, **kwargs):
+    event = Event.query.filter_by(id=id).first()
+    if not event:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # DELETE method
+    if request.method == 'DELETE':
+        event.delete()
+        return {
+            'message' : "Event {} deleted successfully.".format(event.id)
+        }
+    # PUT method
+    elif request.method == 'PUT':
+        title = request.values.get('title')
+        description = request.values.get('description')
+        date = request.values.get('date')
+        time = request.values.get('time')
+        picture = request.values.get('picture')
+        event_type = request.values.get('event_type')
+
+        if title is not None:
+            event.title = title
+        if description is not None:
+            event.description = description
+        if date is not None:
+            event.date = date
+        if time is not None:
+            event.time = time
+        if picture is not None:
+            event.picture = picture
+        if event_type is not None:
+            event.event_type = event_type
+
+        event.save()
+
+        Response = jsonify(EVENT_FIELDS.dump_instance(event))
+
+        Response.status_code = 200
+        return Response
+
+
+####################################
+#         Helper functions         #
+####################################
+
+def summary_preview():
+    # Attendees listed per will_go group with ?preview=N
+    preview = request.args.get('preview', 0, type=int)
+    return max(0, min(preview, current_app.config.get('EVENT_SUMMARY_MAX_PREVIEW', 20)))
@@ -0,0 +1,121 @@
+from flask import Blueprint, request, abort, current_app
+from sqlalchemy import desc, asc
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.auth import require_api_key
+from app.batch import apply_batch
+from app.encoding import jsonify
+from app.models import Favourite, Product, User
+from app.pagination import list_response
+from app.serializers import FAVOURITE_FIELDS, FAVOURITE_DETAIL_FIELDS, TOP_FAVOURITE_FIELDS
+from app.upsert import upsert
+
+####################################
+#    Favourite related endpoints   #
+####################################
+
+bp = Blueprint('favourites', __name__)
+
+
+@bp.route('/api/v1/favourites/', methods=['GET'])
+@require_api_key
+def get_favourites():
+    if request.method == 'GET':
+        fields = FAVOURITE_FIELDS.requested()
+
+        def serialize(fav):
+            return FAVOURITE_FIELDS.dump(fav, fields)
+
+        return list_response(FAVOURITE_FIELDS.select(Favourite.query, fields), Favourite.id, serialize)
+
+
+@bp.route('/api/v1/favourites/top5/', methods=['GET'])
+@require_api_key
+def get_top5_favourites():
+    if request.method == 'GET':
+        limit = request.args.get('limit', 5, type=int)
+        limit = max(1, min(limit, current_app.config.get('TOP_FAVOURITES_MAX_LIMIT', 50)))
+
+        # An index scan on the counter; products nobody has as favourite stay out
+        ranking = db.session.query(Product).filter(Product.favourite_count > 0) \
+            .order_by(desc(Product.favourite_count), asc(Product.id)).limit(limit)
+
+        res = []
+
+        for product in TOP_FAVOURITE_FIELDS.select(ranking):
+            res.append(TOP_FAVOURITE_FIELDS.dump(product))
+
+        Response = jsonify(res)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/favourites/user/<int:id>/', methods=['GET'])
+@require_api_key
+def get_favourites_by_user(id, **kwargs):
+    if request.method == 'GET':
+        fields = FAVOURITE_DETAIL_FIELDS.requested()
+        join = db.session.query(User, Favourite, Product).filter(User.id==id).filter(User.id==Favourite.user_id).filter(Favourite.product_id==Product.id)
+        results = []
+
+        for fav in FAVOURITE_DETAIL_FIELDS.select(join, fields):
+            results.append(FAVOURITE_DETAIL_FIELDS.dump(fav, fields))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/favourites/<int:id>/', methods=['PUT'])
+@require_api_key
+def put_favourites(id, **kwargs):
+    if request.method == 'PUT':
+        status = 0
+        favourite = Favourite.query.filter_by(id=id).first()
+        user_id = request.args.get('user_id', type=int)
+        product_id = request.args.get('product_id', type=int)
+
+        if not favourite:
+            if user_id and product_id:
+                favourite, inserted = upsert(Favourite, {'user_id': user_id, 'product_id': product_id},
+                                             ('user_id', 'product_id'))
+                db.session.commit()
+                status = 201 if inserted else 200
+            else:
+                abort(400)
+        else:
+            if user_id is not None:
+                favourite.user_id = user_id
+            if product_id is not None:
+                favourite.product_id = product_id
+            try:
+                favourite.save()
+            except IntegrityError:
+                # Moved onto a (user, product) pair that already has a favourite
+                db.session.rollback()
+                # Raise an HTTPException with a 409 conflict status code
+                abort(409)
+            status = 200
+
+        Response = jsonify(FAVOURITE_FIELDS.dump_instance(favourite))
+        Response.headers['Access-Control-Allow-Origin'] = '*'
+        Response.status_code = status
+        return Response
+
+
+@bp.route('/api/v1/favourites/batch/', methods=['POST'])
+@require_api_key
+def post_favourites_batch():
+    if request.method == 'POST': # POST method
+        items = request.data
+        if not isinstance(items, list) or len(items) > current_app.config.get('BATCH_MAX_ITEMS', 500):
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+        results = apply_batch(Favourite, items, ('user_id', 'product_id'))
+        db.session.commit()
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
@@ -0,0 +1,49 @@
+from flask import Blueprint, request, current_app
+
+from app import db
+from app.database import pool_status, ping
+from app.encoding import jsonify
+from app.routing import router
+
+####################################
+#     Health related endpoints     #
+####################################
+
+# Unauthenticated, for load balancers and orchestrators
+bp = Blueprint('health', __name__)
+
+
+@bp.route('/health/live/', methods=['GET'])
+def get_liveness():
+    if request.method == 'GET': # GET method
+        # The process answers; the database is not checked on purpose
+        Response = jsonify({'status': 'ok'})
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/health/ready/', methods=['GET'])
+def get_readiness():
+    if request.method == 'GET': # GET method
+        latency = ping(db.engine)
+        results = {
+            'status': 'ok' if latency is not None else 'unavailable',
+            'database': {
+                'latency_ms': round(latency, 2) if latency is not None else None,
+                'pool': pool_status(db.engine)
+            }
+        }
+
+        # Reads fall back to the primary, so a missing replica is not fatal
+        if router.uri:
+            replica_latency = ping(router.engine(current_app._get_current_object()))
+            results['replica'] = {
+                'latency_ms': round(replica_latency, 2) if replica_latency is not None else None,
+                'in_use': router.available(),
+                'pool': pool_status(router.engine(current_app._get_current_object()))
+            }
+
+        Response = jsonify(results)
+        # 503 takes the worker out of rotation until the database is back
+        Response.status_code = 200 if latency is not None else 503
+        return Response
@@ -0,0 +1,152 @@
+from flask import Blueprint, request, abort, current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.auth import require_api_key
+from app.batch import apply_batch
+from app.encoding import jsonify
+from app.models import Like
+from app.pagination import list_response
+from app.serializers import LIKE_FIELDS
+from app.upsert import upsert
+
+####################################
+#      Like related endpoints      #
+####################################
+
+bp = Blueprint('likes', __name__)
+
+
+@bp.route('/api/v1/likes/', methods=['GET'])
+@require_api_key
+def get_likes():
+    if request.method == 'GET': # GET method
+        return list_response(LIKE_FIELDS.select(Like.query), Like.id, LIKE_FIELDS.dump)
+
+
+@bp.route('/api/v1/likes/', methods=['POST'])
+@require_api_key
+def post_likes():
+    if request.method == 'POST': # POST method
+        user_id = request.args.get('user_id', type=int)
+        event_id = request.args.get('event_id', type=int)
+
+        if user_id and event_id:
+            like, inserted = upsert(Like, {'user_id': user_id, 'event_id': event_id}, ('user_id', 'event_id'))
+            db.session.commit()
+
+            if not inserted:
+                Response = jsonify({'message': 'Like already in db'})
+                Response.status_code = 200
+                return Response
+
+            Response = jsonify(LIKE_FIELDS.dump_instance(like))
+            Response.status_code = 201
+            return Response
+        else:
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+
+@bp.route('/api/v1/likes/batch/', methods=['POST'])
+@require_api_key
+def post_likes_batch():
+    if request.method == 'POST': # POST method
+        items = request.data
+        if not isinstance(items, list) or len(items) > current_app.config.get('BATCH_MAX_ITEMS', 500):
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+        results = apply_batch(Like, items, ('user_id', 'event_id'))
+        db.session.commit()
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/likes/<int:id>/', methods=['GET'])
+@require_api_key
+def get_like_by_id(id, **kwargs):
+    like = LIKE_FIELDS.select(Like.query.filter_by(id=id)).first()
+    if not like:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        Response = jsonify(LIKE_FIELDS.dump(like))
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/likes/user/<int:id>/', methods=['GET'])
+@require_api_key
+def get_like_by_user(id, **kwargs):
+    likes = LIKE_FIELDS.select(Like.query.filter_by(user_id=id))
+    results = []
+
+    if not likes:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        for like in likes:
+            results.append(LIKE_FIELDS.dump(like))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/likes/event/<int:id>/', methods=['GET'])
+@require_api_key
+def get_like_by_event(id, **kwargs):
+    likes = LIKE_FIELDS.select(Like.query.filter_by(event_id=id))
+    results = []
+
+    if not likes:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        for like in likes:
+            results.append(LIKE_FIELDS.dump(like))
+
+        Response = jsonify(results)
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/likes/<int:id>/', methods=['PUT', 'DELETE'])
+@require_api_key
+def likes_manipulation(id, **kwargs):
+    like = Like.query.filter_by(id=id).first()
+    if not like:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # DELETE method
+    if request.method == 'DELETE':
+        like.delete()
+        return {
+            'id' : "{}".format(like.id)
+        }
+    # PUT method
+    elif request.method == 'PUT':
+        user_id = request.values.get('user_id')
+        event_id = request.values.get('event_id')
+
+        if user_id is not None:
+            like.user_id = user_id
+        if event_id is not None:
+            like.event_id = event_id
+        try:
+            like.save()
+        except IntegrityError:
+            # Moved onto a (user, event) pair that already has a like
+            db.session.rollback()
+            # Raise an HTTPException with a 409 conflict status code
+            abort(409)
+
+        Response = jsonify(LIKE_FIELDS.dump_instance(like))
+        Response.status_code = 200
+        return Response
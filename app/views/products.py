@@ -0,0 +1,128 @@
+from flask import Blueprint, request, abort
+
+from app.auth import require_api_key, require_admin_key
+from app.cache import catalog_cache
+from app.encoding import jsonify
+from app.models import Product
+from app.pagination import list_response
+from app.serializers import PRODUCT_FIELDS
+from app.versions import conditional
+
+####################################
+#     Product related endpoints    #
+####################################
+
+bp = Blueprint('products', __name__)
+
+
+@bp.route('/api/v1/products/', methods=['GET'])
+@require_api_key
+@conditional(('products', 'categories'), policy='catalog')
+@catalog_cache.cached
+def get_products():
+    if request.method == 'GET': # GET method
+        fields = PRODUCT_FIELDS.requested()
+
+        def serialize(product):
+            return PRODUCT_FIELDS.dump(product, fields)
+
+        return list_response(PRODUCT_FIELDS.select(Product.query, fields), Product.id, serialize)
+
+
+@bp.route('/api/v1/products/', methods=['POST'])
+@require_admin_key
+def post_products():
+    if request.method == 'POST': # POST method
+        name = request.values.get('name')
+        description = request.values.get('description')
+        category_id = request.values.get('category_id')
+        proof = request.values.get('proof')
+        country = request.values.get('country')
+        available = (request.values.get('available') == 'True')
+        price = request.values.get('price')
+        picture = request.values.get('picture')
+
+        if category_id and name and description and price:
+            product = Product(
+                name=name,
+                description=description,
+                category_id=category_id,
+                proof=proof,
+                country=country,
+                picture=picture,
+                available=available,
+                price=price
+            )
+            product.save()
+            catalog_cache.bump()
+
+            Response = jsonify(PRODUCT_FIELDS.dump_instance(product))
+            Response.status_code = 201
+            return Response
+
+
+@bp.route('/api/v1/products/<int:id>/', methods=['GET'])
+@require_api_key
+@conditional(('products', 'categories'), policy='catalog')
+@catalog_cache.cached
+def get_product_by_id(id, **kwargs):
+    fields = PRODUCT_FIELDS.requested()
+    product = PRODUCT_FIELDS.select(Product.query.filter_by(id=id), fields).first()
+    if not product:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET method
+    if request.method == 'GET':
+        Response = jsonify(PRODUCT_FIELDS.dump(product, fields))
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/products/<int:id>/', methods=['PUT', 'DELETE'])
+@require_admin_key
+def products_manipulation(id, **kwargs):
+    product = Product.query.filter_by(id=id).first()
+    if not product:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # DELETE method
+    if request.method == 'DELETE':
+        product.delete()
+        catalog_cache.bump()
+        return {
+            'message' : "Product {} deleted successfully.".format(product.id)
+        }
+    # PUT method
+    elif request.method == 'PUT':
+        name = request.values.get('name')
+        description = request.values.get('description')
+        category_id = request.values.get('category_id')
+        proof = request.values.get('proof')
+        country = request.values.get('country')
+        available = (request.values.get('available') == 'True')
+        price = request.values.get('price')
+        picture = request.values.get('picture')
+
+        if name is not None:
+            product.name = name
+        if description is not None:
+            product.description = description
+        if category_id is not None:
+            product.category_id = category_id
+        if proof is not None:
+            product.proof = proof
+        if country is not None:
+            product.country = country
+        if available is not None:
+            product.available = available
+        if price is not None:
+            product.price = price
+        if picture is not None:
+            product.picture = picture
+
+        product.save()
+        catalog_cache.bump()
+
+        Response = jsonify(PRODUCT_FIELDS.dump_instance(product))
+        Response.status_code = 200
+        return Response
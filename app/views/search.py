@@ -0,0 +1,67 @@
+from flask import Blueprint, request, abort, current_app
+
+from app.auth import require_api_key
+from app.encoding import jsonify
+from app.models import Event, Product
+from app.pagination import next_url
+from app.search import SEARCHABLE, search
+from app.serializers import EVENT_FIELDS, PRODUCT_FIELDS
+from app.versions import conditional
+
+####################################
+#     Search related endpoints     #
+####################################
+
+bp = Blueprint('search', __name__)
+
+
+@bp.route('/api/v1/search/', methods=['GET'])
+@require_api_key
+@conditional(('products', 'events'), policy='catalog')
+def get_search():
+    if request.method == 'GET': # GET method
+        q = request.args.get('q', '').strip()
+        types = request.args.get('type')
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 20, type=int)
+
+        if not q or len(q) > 200 or offset < 0:
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+        if types:
+            types = [name.strip() for name in types.split(',') if name.strip()]
+            if not types or any(name not in SEARCHABLE for name in types):
+                # Raise an HTTPException with a 400 bad request status code
+                abort(400)
+        else:
+            types = list(SEARCHABLE)
+        limit = max(1, min(limit, current_app.config.get('SEARCH_MAX_LIMIT', 100)))
+
+        try:
+            matches = search(q, types, offset, limit)
+        except NotImplementedError:
+            # Raise an HTTPException with a 501 not implemented status code
+            abort(501)
+
+        # One query per type for the rows of this page
+        rows = {}
+        for name, fields, model in (('products', PRODUCT_FIELDS, Product), ('events', EVENT_FIELDS, Event)):
+            ids = [match_id for match_type, match_id, _ in matches if match_type == name]
+            if ids:
+                for row in fields.select(model.query.filter(model.id.in_(ids))):
+                    result = fields.dump(row)
+                    rows[(name, result['id'])] = result
+
+        results = []
+        for match_type, match_id, rank in matches:
+            result = rows.get((match_type, match_id))
+            if result is not None:
+                result = dict(result, type=match_type, rank=rank)
+                results.append(result)
+
+        Response = jsonify(results)
+        if len(matches) == limit:
+            Response.headers['Link'] = '<{}>; rel="next"'.format(next_url(offset=offset + limit))
+        Response.status_code = 200
+        return Response
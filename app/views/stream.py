@@ -0,0 +1,56 @@
+from flask import Blueprint, request, abort, g, current_app
+
+from app import db
+from app.auth import authenticate, stream_signer, require_api_key
+from app.encoding import jsonify
+from app.stream import broker
+
+####################################
+#     Stream related endpoints     #
+####################################
+
+bp = Blueprint('stream', __name__)
+
+
+@bp.route('/api/v1/stream/', methods=['GET'])
+def get_stream():
+    if request.method == 'GET': # GET method
+        # EventSource cannot send headers, so it passes a token from
+        # POST /api/v1/stream/tokens/ as ?token=; other clients use headers
+        token = request.args.get('token')
+        if token:
+            principal = stream_signer.verify(token) if stream_signer.enabled else None
+        else:
+            principal = authenticate(request)
+        if principal is None:
+            abort(401)
+        g.principal = principal
+
+        # Sent back by EventSource when it reconnects
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+
+        # An idle stream must not keep a pooled connection checked out
+        db.session.remove()
+
+        Response = current_app.response_class(broker.stream(last_event_id), mimetype='text/event-stream')
+        Response.headers['Cache-Control'] = 'no-cache'
+        # Stops nginx from buffering the stream
+        Response.headers['X-Accel-Buffering'] = 'no'
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/stream/tokens/', methods=['POST'])
+@require_api_key
+def post_stream_tokens():
+    if request.method == 'POST': # POST method
+        if not stream_signer.enabled:
+            # No signing key configured
+            abort(501)
+
+        Response = jsonify({
+            'token': stream_signer.issue(g.principal),
+            'expires_in': stream_signer.max_age
+        })
+        Response.status_code = 201
+        return Response
@@ -0,0 +1,51 @@
+from datetime import datetime
+
+from dateutil import parser, tz
+from flask import Blueprint, request, abort, g, current_app
+
+from app.auth import require_api_key
+from app.encoding import jsonify
+from app.sync import ENTITIES as SYNC_ENTITIES, DEFAULT_ENTITIES as DEFAULT_SYNC_ENTITIES, changes
+
+####################################
+#      Sync related endpoints      #
+####################################
+
+bp = Blueprint('sync', __name__)
+
+
+@bp.route('/api/v1/sync/', methods=['GET'])
+@require_api_key
+def get_sync():
+    if request.method == 'GET': # GET method
+        since = request.args.get('since')
+        entities = request.args.get('entities')
+
+        if since:
+            # Seconds since the epoch (the "until" of the last sync) or an ISO 8601 date
+            try:
+                since = datetime.utcfromtimestamp(float(since))
+            except (ValueError, OverflowError, OSError):
+                try:
+                    since = parser.parse(since)
+                except (ValueError, OverflowError):
+                    # Raise an HTTPException with a 400 bad request status code
+                    abort(400)
+                if since.tzinfo is not None:
+                    since = since.astimezone(tz.tzutc()).replace(tzinfo=None)
+        else:
+            since = None
+
+        if entities:
+            entities = [name.strip() for name in entities.split(',') if name.strip()]
+            if not entities or any(name not in SYNC_ENTITIES for name in entities):
+                # Raise an HTTPException with a 400 bad request status code
+                abort(400)
+        else:
+            entities = DEFAULT_SYNC_ENTITIES
+
+        Response = jsonify(changes(entities, since, g.principal,
+                                   overlap=current_app.config.get('SYNC_OVERLAP', 5),
+                                   tombstone_days=current_app.config.get('SYNC_TOMBSTONE_DAYS', 90)))
+        Response.status_code = 200
+        return Response
@@ -0,0 +1,47 @@
+from flask import Blueprint, request, abort, g
+
+from app.auth import token_signer, require_api_key, require_key_header
+from app.encoding import jsonify
+
+####################################
+#      Token related endpoints     #
+####################################
+
+bp = Blueprint('tokens', __name__)
+
+
+@bp.route('/api/v1/tokens/', methods=['POST'])
+@require_key_header
+def post_tokens():
+    if request.method == 'POST': # POST method
+        if not token_signer.enabled:
+            # No signing key configured
+            abort(501)
+
+        Response = jsonify({
+            'token': token_signer.issue(g.principal),
+            'token_type': 'Bearer',
+            'expires_in': token_signer.max_age,
+            'role': g.principal.role
+        })
+        Response.status_code = 201
+        return Response
+
+
+@bp.route('/api/v1/tokens/', methods=['DELETE'])
+@require_api_key
+def delete_tokens():
+    if request.method == 'DELETE': # DELETE method
+        token = request.values.get('token')
+        claims = token_signer.claims(token, check_expiry=False) if token else None
+
+        if claims is None:
+            abort(400)
+        # Users may only revoke their own tokens
+        if g.principal.role != 'admin' and (claims['role'], claims['sub']) != tuple(g.principal):
+            abort(403)
+
+        token_signer.revoke(token)
+        return {
+            'message' : "Token {} revoked successfully.".format(claims['jti'])
+        }
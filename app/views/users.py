@@ -0,0 +1,124 @@
+from datetime import date
+import hashlib
+
+from flask import Blueprint, request, abort
+
+from app import db
+from app.auth import require_api_key, require_admin_key
+from app.encoding import jsonify
+from app.models import User
+from app.pagination import list_response
+from app.serializers import USER_FIELDS, USER_PUBLIC
+from app.upsert import upsert
+
+####################################
+#      User related endpoints      #
+####################################
+
+bp = Blueprint('users', __name__)
+
+
+@bp.route('/api/v1/users/', methods=['GET'])
+@require_api_key
+def get_users():
+    if request.method == 'GET':  # GET method
+        fields = USER_FIELDS.requested()
+
+        def serialize(user):
+            return USER_FIELDS.dump(user, fields)
+
+        return list_response(USER_FIELDS.select(User.query, fields), User.id, serialize)
+
+
+@bp.route('/api/v1/users/', methods=['POST'])
+@require_api_key
+def post_users():
+    if request.method == 'POST':  # POST method
+        name = request.args.get('name')
+        email = request.args.get('email')
+        profile_pic = request.args.get('profile_pic')
+
+        if not email:
+            # Raise an HTTPException with a 400 bad request status code
+            abort(400)
+
+        # Logins are a read of the unique email index; only new users are written
+        user = User.query.filter_by(email=email).first()
+        status = 200
+        if not user:
+            if not name:
+                # Raise an HTTPException with a 400 bad request status code
+                abort(400)
+            # Inserts the user or returns the one a concurrent request registered
+            user, inserted = upsert(User, {
+                'name': name,
+                'email': email,
+                'profile_pic': profile_pic,
+                'api_key': generate_api_key(email),
+                'start_date': date.today()
+            }, ('email',))
+            db.session.commit()
+            status = 201 if inserted else 200
+
+        Response = jsonify(USER_FIELDS.dump_instance(user, USER_PUBLIC))
+        Response.status_code = status
+        return Response
+
+
+@bp.route('/api/v1/users/<int:id>/', methods=['GET'])
+@require_api_key
+def get_user_by_id(id, **kwargs):
+    fields = USER_FIELDS.requested(USER_PUBLIC)
+    user = USER_FIELDS.select(User.query.filter_by(id=id), fields).first()
+    if not user:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+    # GET Method
+    if request.method == 'GET':
+        Response = jsonify(USER_FIELDS.dump(user, fields))
+        Response.status_code = 200
+        return Response
+
+
+@bp.route('/api/v1/users/<int:id>/', methods=['PUT', 'DELETE'])
+@require_admin_key
+def user_manipulation(id, **kwargs):
+    user = User.query.filter_by(id=id).first()
+
+    if not user:
+        # Raise an HTTPException with a 404 not found status code
+        abort(404)
+
+    # DELETE Method
+    if request.method == 'DELETE':
+        user.delete()
+        return {
+            'message' : "User {} deleted successfully.".format(user.id)
+        }
+    # PUT Method
+    elif request.method == 'PUT':
+        name = request.values.get('name')
+        email = request.values.get('email')
+        profile_pic = request.values.get('profile_pic')
+
+        if name is not None:
+            user.name = name
+        if email is not None:
+            user.email = email
+        if profile_pic is not None:
+            user.profile_pic = profile_pic
+        user.save()
+
+        response = jsonify(USER_FIELDS.dump_instance(user, USER_PUBLIC))
+        response.status_code = 200
+        return response
+
+
+####################################
+#         Helper functions         #
+####################################
+
+def generate_api_key(input):
+    salt = "INSERT SALT HASH HERE"
+    data = str(input)+str(salt)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
@@ -0,0 +1,83 @@
+# Compares API-key authentication cost as the users table grows.
+#
+#   python -m benchmarks.auth_lookup [--scales 1000,10000,100000] [--database sqlite://]
+#
+# "scan" is the old require_api_key behaviour (User.get_all() + ApiKey.get_all()
+# and a Python loop), "index miss" is a KeyIndex lookup that falls through to
+# the database, "index hit" is a lookup served from memory.
+import argparse
+import hashlib
+import timeit
+
+from flask import Flask
+
+from app import db
+from app.auth import KeyIndex
+from app.models import User, ApiKey
+
+
+def make_app(database):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def api_key(n):
+    return hashlib.sha256(str(n).encode('utf-8')).hexdigest()
+
+
+def seed(size):
+    db.drop_all()
+    db.create_all()
+    db.session.bulk_insert_mappings(User, [
+        {'name': 'user{}'.format(n), 'email': 'user{}@example.com'.format(n), 'api_key': api_key(n)}
+        for n in range(size)
+    ])
+    db.session.add(ApiKey(key='admin'))
+    db.session.commit()
+
+
+def scan(key):
+    for user in User.get_all():
+        if user.api_key == key:
+            return True
+    for admin in ApiKey.get_all():
+        if admin.key == key:
+            return True
+    return False
+
+
+def run(scales, database, repeat):
+    app = make_app(database)
+    print('{:>10} {:>14} {:>14} {:>14}'.format('users', 'scan (ms)', 'miss (ms)', 'hit (ms)'))
+
+    with app.app_context():
+        for size in scales:
+            seed(size)
+            key = api_key(size - 1)
+            index = KeyIndex(ttl=3600)
+
+            scan_ms = min(timeit.repeat(lambda: scan(key), number=1, repeat=3)) * 1000
+
+            def miss():
+                index.invalidate()
+                index.lookup(key)
+            miss_ms = min(timeit.repeat(miss, number=repeat, repeat=3)) / repeat * 1000
+
+            index.lookup(key)
+            hit_ms = min(timeit.repeat(lambda: index.lookup(key), number=repeat, repeat=3)) / repeat * 1000
+
+            print('{:>10} {:>14.3f} {:>14.3f} {:>14.4f}'.format(size, scan_ms, miss_ms, hit_ms))
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--scales', default='1000,10000,100000')
+    arg_parser.add_argument('--database', default='sqlite://')
+    arg_parser.add_argument('--repeat', type=int, default=1000)
+    args = arg_parser.parse_args()
+
+    run([int(n) for n in args.scales.split(',')], args.database, args.repeat)
@@ -0,0 +1,141 @@
+# Seeded, reproducible dataset for the benchmarks.
+#
+#   python -m benchmarks.dataset [--scale 100000] [--database sqlite:///bench.db] [--seed 0]
+#
+# `scale` is the number of likes, attends and favourites; the other tables are
+# sized from it with RATIOS (1000 -> 100 users and 10 events, 1000000 -> 100000
+# users and 10000 events). The same scale and seed always give the same rows.
+from collections import OrderedDict
+from decimal import Decimal
+import argparse
+import datetime
+import hashlib
+import random
+
+from flask import Flask
+
+from app import db
+from app.counters import counters
+from app.models import User, Event, Product, Category, Like, Attend, Favourite, ApiKey
+
+# Rows per table for each unit of scale
+RATIOS = OrderedDict([
+    ('users', 0.1),
+    ('categories', 0.001),
+    ('events', 0.01),
+    ('products', 0.01),
+    ('likes', 1.0),
+    ('attends', 1.0),
+    ('favourites', 1.0)
+])
+
+ADMIN_KEY = 'bench-admin'
+EVENT_TYPES = ('event', 'event', 'news')
+WILL_GO = ('going', 'interested')
+TODAY = datetime.date.today()
+
+
+def sizes(scale):
+    return OrderedDict((table, max(10, int(scale * ratio))) for table, ratio in RATIOS.items())
+
+
+def api_key(n):
+    return hashlib.sha256('bench-user-{}'.format(n).encode('utf-8')).hexdigest()
+
+
+def generate(scale, seed=0, chunk_size=10000):
+    # Recreates every table and fills it. Ids are assigned by the database in
+    # insertion order, so row n of a table has id n.
+    rng = random.Random(seed)
+    n = sizes(scale)
+
+    db.drop_all()
+    db.create_all()
+
+    insert(User, ({
+        'name': 'user{}'.format(i),
+        'email': 'user{}@example.com'.format(i),
+        'profile_pic': 'https://example.com/users/{}.jpg'.format(i),
+        'api_key': api_key(i),
+        'start_date': TODAY - datetime.timedelta(days=rng.randrange(1000))
+    } for i in range(1, n['users'] + 1)), chunk_size)
+
+    insert(Category, ({
+        'name': 'category{}'.format(i),
+        'url': 'https://example.com/categories/{}.jpg'.format(i)
+    } for i in range(1, n['categories'] + 1)), chunk_size)
+
+    insert(Event, ({
+        'title': 'event{}'.format(i),
+        'description': 'Description of event {}. '.format(i) * 4,
+        'date': TODAY + datetime.timedelta(days=rng.randint(-365, 365)),
+        'time': datetime.time(rng.randrange(24), rng.choice((0, 30))),
+        'picture': 'https://example.com/events/{}.jpg'.format(i),
+        'event_type': rng.choice(EVENT_TYPES)
+    } for i in range(1, n['events'] + 1)), chunk_size)
+
+    insert(Product, ({
+        'name': 'product{}'.format(i),
+        'description': 'Description of product {}. '.format(i) * 4,
+        'category_id': rng.randint(1, n['categories']),
+        'proof': Decimal(rng.randint(0, 9999)) / 100,
+        'country': rng.choice(('Portugal', 'Spain', 'Scotland', 'Ireland', 'Mexico')),
+        'picture': 'https://example.com/products/{}.jpg'.format(i),
+        'available': rng.random() < 0.9,
+        'price': Decimal(rng.randint(100, 999)) / 100
+    } for i in range(1, n['products'] + 1)), chunk_size)
+
+    insert(Like, ({'user_id': user_id, 'event_id': event_id}
+                  for user_id, event_id in pairs(rng, n['users'], n['events'], n['likes'])), chunk_size)
+
+    insert(Attend, ({'user_id': user_id, 'event_id': event_id, 'will_go': rng.choice(WILL_GO)}
+                    for user_id, event_id in pairs(rng, n['users'], n['events'], n['attends'])), chunk_size)
+
+    insert(Favourite, ({'user_id': user_id, 'product_id': product_id}
+                       for user_id, product_id in pairs(rng, n['users'], n['products'], n['favourites'])), chunk_size)
+
+    # The bulk inserts above bypass the counters
+    counters.rebuild()
+
+    db.session.add(ApiKey(key=ADMIN_KEY))
+    db.session.commit()
+    return n
+
+
+def pairs(rng, left, right, count):
+    # `count` distinct (left id, right id) pairs, as the unique constraints on
+    # likes, attends and favourites require
+    count = min(count, left * right)
+    seen = set()
+    while len(seen) < count:
+        seen.add((rng.randint(1, left), rng.randint(1, right)))
+    return sorted(seen)
+
+
+def insert(model, rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.session.execute(model.__table__.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(model.__table__.insert(), chunk)
+    db.session.commit()
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--scale', type=int, default=1000)
+    arg_parser.add_argument('--database', default='sqlite:///bench.db')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    args = arg_parser.parse_args()
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = args.database
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        for table, size in generate(args.scale, args.seed).items():
+            print('{:>12} {:>10}'.format(table, size))
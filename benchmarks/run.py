@@ -0,0 +1,251 @@
+# Drives every route of create_app() through the Flask test client against the
+# seeded dataset of benchmarks.dataset and reports latency percentiles,
+# throughput and SQL queries per request.
+#
+#   python -m benchmarks.run [--scale 1000] [--database sqlite://] [--requests 50]
+#                            [--routes likes] [--no-seed] [--no-cache]
+#                            [--save baseline.json] [--baseline baseline.json]
+#
+# The app is built from the --config entry of instance/config.py with the
+# database replaced. Requests are made one at a time, so "req/s" is the
+# throughput of a single worker. With --baseline, p50 and p95 are compared
+# against a file written by an earlier --save.
+from collections import namedtuple
+import argparse
+import itertools
+import json
+import random
+import re
+import timeit
+
+from sqlalchemy import event, func, select
+
+from app import create_app, db
+from app.models import User, Event, Product, Category, Like, Attend, Favourite
+from benchmarks.dataset import ADMIN_KEY, WILL_GO, generate, sizes
+
+# `path` is a string, or a function called before the timer starts (it may
+# insert the row a DELETE is about to remove). Any status outside `expected`
+# counts as an error.
+Case = namedtuple('Case', ['name', 'method', 'path', 'data', 'expected'])
+Case.__new__.__defaults__ = ((200,),)
+
+
+def cases(n, rng, client):
+    counter = itertools.count()
+
+    def random_id(table):
+        return rng.randint(1, n[table])
+
+    def existing_id(model):
+        # The batches remove rows, so a random id may be gone
+        table = model.__table__
+        row_id = db.session.execute(select([table.c.id]).where(table.c.id >= random_id(model.__tablename__))
+                                    .order_by(table.c.id).limit(1)).scalar()
+        return row_id if row_id is not None else db.session.execute(select([func.min(table.c.id)])).scalar()
+
+    def new_row(model, **values):
+        result = db.session.execute(model.__table__.insert().values(**values))
+        db.session.commit()
+        return result.inserted_primary_key[0]
+
+    def new_user():
+        i = next(counter)
+        return new_row(User, name='bench', email='bench{}@example.com'.format(i), api_key='bench-{}'.format(i))
+
+    def new_token():
+        response = client.post('/api/v1/tokens/', headers={'X-Api-Key': ADMIN_KEY})
+        return json.loads(response.get_data()).get('token', '') if response.status_code == 201 else ''
+
+    def batch(column, table, extra=None):
+        items = []
+        for _ in range(50):
+            item = {'user_id': random_id('users'), column: random_id(table)}
+            if extra:
+                item.update(extra())
+            if rng.random() < 0.2:
+                item['op'] = 'remove'
+            items.append(item)
+        return items
+
+    return [
+        Case('POST /tokens/', 'POST', '/api/v1/tokens/', None, (201,)),
+        Case('DELETE /tokens/', 'DELETE', lambda: '/api/v1/tokens/?token={}'.format(new_token()), None),
+
+        Case('GET /users/', 'GET', '/api/v1/users/', None),
+        Case('GET /users/?limit=100', 'GET', '/api/v1/users/?limit=100', None),
+        Case('POST /users/', 'POST', lambda: '/api/v1/users/?name=bench&email=new{}@example.com'.format(next(counter)), None,
+             (201,)),
+        Case('GET /users/<id>/', 'GET', lambda: '/api/v1/users/{}/'.format(random_id('users')), None),
+        Case('PUT /users/<id>/', 'PUT', lambda: '/api/v1/users/{}/?name=renamed'.format(random_id('users')), None),
+        Case('DELETE /users/<id>/', 'DELETE', lambda: '/api/v1/users/{}/'.format(new_user()), None),
+
+        Case('GET /events/', 'GET', '/api/v1/events/', None),
+        Case('GET /events/news/', 'GET', '/api/v1/events/news/', None),
+        Case('GET /events/event/', 'GET', '/api/v1/events/event/', None),
+        Case('GET /events/event/all/', 'GET', '/api/v1/events/event/all/', None),
+        Case('POST /events/', 'POST', '/api/v1/events/?title=bench&description=bench&event_type=event', None, (201,)),
+        Case('GET /events/<id>/', 'GET', lambda: '/api/v1/events/{}/'.format(random_id('events')), None),
+        Case('PUT /events/<id>/', 'PUT', lambda: '/api/v1/events/{}/?title=renamed'.format(random_id('events')), None),
+        Case('DELETE /events/<id>/', 'DELETE', lambda: '/api/v1/events/{}/'.format(
+            new_row(Event, title='bench', description='bench', event_type='event')), None),
+        Case('GET /events/<id>/summary/', 'GET', lambda: '/api/v1/events/{}/summary/?preview=5'.format(random_id('events')), None),
+        Case('GET /events/summary/?ids=', 'GET', lambda: '/api/v1/events/summary/?ids={}'.format(
+            ','.join(str(random_id('events')) for _ in range(20))), None),
+
+        Case('GET /search/?q=', 'GET', lambda: '/api/v1/search/?q=product{}'.format(random_id('products')), None),
+        Case('GET /search/?q=&limit=100', 'GET', '/api/v1/search/?q=description&limit=100', None),
+
+        Case('GET /products/', 'GET', '/api/v1/products/', None),
+        Case('POST /products/', 'POST', lambda: '/api/v1/products/?name=new{}&description=bench&category_id=1'
+             '&proof=40&country=Portugal&available=True&price=2.50&picture=bench'.format(next(counter)), None, (201,)),
+        Case('GET /products/<id>/', 'GET', lambda: '/api/v1/products/{}/'.format(random_id('products')), None),
+        Case('PUT /products/<id>/', 'PUT', lambda: '/api/v1/products/{}/?country=Spain'.format(random_id('products')), None),
+        Case('DELETE /products/<id>/', 'DELETE', lambda: '/api/v1/products/{}/'.format(
+            new_row(Product, name='gone{}'.format(next(counter)), description='bench', price=1)), None),
+
+        Case('GET /categories/', 'GET', '/api/v1/categories/', None),
+        Case('POST /categories/', 'POST', lambda: '/api/v1/categories/?name=new{}&url=bench'.format(next(counter)), None,
+             (201,)),
+        Case('GET /categories/<id>/', 'GET', lambda: '/api/v1/categories/{}/'.format(random_id('categories')), None),
+        Case('PUT /categories/<id>/', 'PUT', lambda: '/api/v1/categories/{}/?url=renamed'.format(random_id('categories')), None),
+        Case('DELETE /categories/<id>/', 'DELETE', lambda: '/api/v1/categories/{}/'.format(
+            new_row(Category, name='gone{}'.format(next(counter)), url='bench')), None),
+        Case('GET /products/category/<id>', 'GET', lambda: '/api/v1/products/category/{}'.format(random_id('categories')), None),
+
+        Case('GET /likes/', 'GET', '/api/v1/likes/', None),
+        # 201 for a new pair, 200 for one already liked
+        Case('POST /likes/', 'POST', lambda: '/api/v1/likes/?user_id={}&event_id={}'.format(
+            random_id('users'), random_id('events')), None, (200, 201)),
+        Case('POST /likes/batch/', 'POST', '/api/v1/likes/batch/', lambda: batch('event_id', 'events')),
+        Case('GET /likes/<id>/', 'GET', lambda: '/api/v1/likes/{}/'.format(existing_id(Like)), None),
+        Case('GET /likes/user/<id>/', 'GET', lambda: '/api/v1/likes/user/{}/'.format(random_id('users')), None),
+        Case('GET /likes/event/<id>/', 'GET', lambda: '/api/v1/likes/event/{}/'.format(random_id('events')), None),
+        Case('PUT /likes/<id>/', 'PUT', lambda: '/api/v1/likes/{}/'.format(existing_id(Like)), None),
+        Case('DELETE /likes/<id>/', 'DELETE', lambda: '/api/v1/likes/{}/'.format(
+            new_row(Like, user_id=new_user(), event_id=1)), None),
+
+        Case('GET /attends/', 'GET', '/api/v1/attends/', None),
+        Case('GET /attends/all/', 'GET', '/api/v1/attends/all/', None),
+        Case('GET /attends/<category>/', 'GET', '/api/v1/attends/going/', None),
+        Case('GET /attends/event/<id>/<category>/', 'GET', lambda: '/api/v1/attends/event/{}/going/'.format(
+            random_id('events')), None),
+        Case('GET /attends/event/<id>/all/', 'GET', lambda: '/api/v1/attends/event/{}/all/'.format(random_id('events')), None),
+        Case('PUT /attends/', 'PUT', lambda: '/api/v1/attends/?user_id={}&event_id={}&will_go={}'.format(
+            random_id('users'), random_id('events'), rng.choice(WILL_GO)), None, (200, 201)),
+        Case('PUT /attends/<id>/', 'PUT', lambda: '/api/v1/attends/{}/?will_go={}'.format(
+            existing_id(Attend), rng.choice(WILL_GO)), None),
+        Case('POST /attends/batch/', 'POST', '/api/v1/attends/batch/', lambda: batch(
+            'event_id', 'events', lambda: {'will_go': rng.choice(WILL_GO)})),
+
+        Case('GET /favourites/', 'GET', '/api/v1/favourites/', None),
+        Case('GET /favourites/top5/', 'GET', '/api/v1/favourites/top5/', None),
+        Case('GET /favourites/user/<id>/', 'GET', lambda: '/api/v1/favourites/user/{}/'.format(random_id('users')), None),
+        Case('PUT /favourites/<id>/', 'PUT', lambda: '/api/v1/favourites/{}/'.format(existing_id(Favourite)), None),
+        Case('POST /favourites/batch/', 'POST', '/api/v1/favourites/batch/', lambda: batch('product_id', 'products'))
+    ]
+
+
+def percentile(values, p):
+    # Nearest rank on sorted values
+    return values[max(0, int(round(p / 100.0 * len(values))) - 1)]
+
+
+def measure(client, case, requests, warmup, queries):
+    headers = {'X-Api-Key': ADMIN_KEY}
+    timings = []
+    counts = []
+    errors = 0
+
+    for i in range(warmup + requests):
+        path = case.path() if callable(case.path) else case.path
+        data = case.data() if case.data else None
+
+        queries[0] = 0
+        start = timeit.default_timer()
+        response = client.open(path, method=case.method, headers=headers, json=data)
+        # Streamed bodies are produced while they are read
+        response.get_data()
+        elapsed = timeit.default_timer() - start
+
+        if i >= warmup:
+            timings.append(elapsed)
+            counts.append(queries[0])
+            errors += response.status_code not in case.expected
+
+    timings.sort()
+    return {
+        'p50': percentile(timings, 50) * 1000,
+        'p95': percentile(timings, 95) * 1000,
+        'p99': percentile(timings, 99) * 1000,
+        'rps': len(timings) / sum(timings),
+        'queries': float(sum(counts)) / len(counts),
+        'errors': errors
+    }
+
+
+def change(value, base):
+    if not base:
+        return ''
+    return '{:+.0f}%'.format((value - base) / base * 100)
+
+
+def run(args):
+    app = create_app(args.config, {
+        'SQLALCHEMY_DATABASE_URI': args.database,
+        'SQLALCHEMY_ECHO': False,
+        'CATALOG_CACHE_MAX_ENTRIES': 0 if args.no_cache else 256
+    })
+    client = app.test_client()
+    rng = random.Random(args.seed)
+    pattern = re.compile(args.routes) if args.routes else None
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    with app.app_context():
+        if args.no_seed:
+            n = sizes(args.scale)
+        else:
+            n = generate(args.scale, args.seed)
+
+        # One counter for the whole run; measure() resets it around each request
+        queries = [0]
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_query(*_):
+            queries[0] += 1
+
+        print('{:<36} {:>9} {:>9} {:>9} {:>9} {:>8} {:>6} {:>7} {:>7}'.format(
+            'route', 'p50 (ms)', 'p95 (ms)', 'p99 (ms)', 'req/s', 'queries', 'errors', 'p50', 'p95'))
+
+        for case in cases(n, rng, client):
+            if pattern and not pattern.search(case.name):
+                continue
+            result = results[case.name] = measure(client, case, args.requests, args.warmup, queries)
+            base = baseline.get(case.name, {})
+            print('{:<36} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.0f} {:>8.1f} {:>6} {:>7} {:>7}'.format(
+                case.name, result['p50'], result['p95'], result['p99'], result['rps'], result['queries'],
+                result['errors'], change(result['p50'], base.get('p50')), change(result['p95'], base.get('p95'))))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'scale': args.scale, 'database': args.database, 'results': results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--scale', type=int, default=1000)
+    arg_parser.add_argument('--database', default='sqlite://')
+    arg_parser.add_argument('--config', default='testing')
+    arg_parser.add_argument('--requests', type=int, default=50)
+    arg_parser.add_argument('--warmup', type=int, default=5)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--routes', help='only run routes matching this regular expression')
+    arg_parser.add_argument('--no-seed', action='store_true', help='reuse the data already in --database')
+    arg_parser.add_argument('--no-cache', action='store_true', help='disable the catalog response cache')
+    arg_parser.add_argument('--save', help='write the results to this file')
+    arg_parser.add_argument('--baseline', help='compare against results written by --save')
+    run(arg_parser.parse_args())
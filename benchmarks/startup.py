@@ -0,0 +1,158 @@
+# Measures how long a worker takes to become useful: importing the app,
+# create_app(), SQLAlchemy mapper configuration and the first requests.
+#
+#   python -m benchmarks.startup [--runs 10] [--database <uri>] [--config testing]
+#                                [--save startup.json] [--baseline startup.json]
+#
+# Every run is a fresh Python process, so nothing is shared between runs.
+# "mappers" is whatever mapper configuration create_app() left undone.
+# "forked worker" is what gunicorn --preload saves: a process forked after
+# the app was loaded (and the mappers configured) in its parent, timed from
+# the fork to the end of its first request.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+PHASES = ['import', 'create_app', 'mappers', 'first request', 'second request', 'cold total', 'forked worker']
+
+
+def child(args):
+    # Runs in the fresh process started by main()
+    timings = {}
+
+    start = time.time()
+    from app import create_app, db
+    timings['import'] = time.time() - start
+
+    start = time.time()
+    app = create_app(args.config, {
+        'SQLALCHEMY_DATABASE_URI': args.database,
+        'SQLALCHEMY_ECHO': False,
+        'METRICS_ENABLED': False
+    })
+    timings['create_app'] = time.time() - start
+
+    start = time.time()
+    from sqlalchemy.orm import configure_mappers
+    configure_mappers()
+    timings['mappers'] = time.time() - start
+
+    # Only the tables and one key; the first request is about code, not data
+    with app.app_context():
+        from app.models import ApiKey
+        db.create_all()
+        if not ApiKey.query.filter_by(key='startup').first():
+            db.session.execute(ApiKey.__table__.insert().values(key='startup'))
+        db.session.commit()
+
+    client = app.test_client()
+    headers = {'X-Api-Key': 'startup'}
+
+    def request():
+        response = client.get('/api/v1/products/', headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError('GET /api/v1/products/ answered {}'.format(response.status_code))
+
+    def forked():
+        # The parent has loaded everything but served nothing, like a
+        # gunicorn master with preload_app
+        read, write = os.pipe()
+        start = time.time()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            from app.database import dispose_engines
+            dispose_engines(app)
+            request()
+            os.write(write, str(time.time() - start).encode('ascii'))
+            os._exit(0)
+        os.close(write)
+        elapsed = float(os.read(read, 64).decode('ascii'))
+        os.waitpid(pid, 0)
+        return elapsed
+
+    # Before the parent's own first request, so the child inherits nothing
+    # that a request warms up. The child disposes the engines, so an
+    # in-memory SQLite database would be gone.
+    if hasattr(os, 'fork') and args.database != 'sqlite://':
+        timings['forked worker'] = forked()
+
+    start = time.time()
+    request()
+    timings['first request'] = time.time() - start
+
+    start = time.time()
+    request()
+    timings['second request'] = time.time() - start
+
+    timings['cold total'] = sum(timings[phase] for phase in ('import', 'create_app', 'mappers', 'first request'))
+    print(json.dumps(dict((phase, value * 1000) for phase, value in timings.items())))
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2.0
+
+
+def change(value, base):
+    if not base:
+        return ''
+    return '{:+.0f}%'.format((value - base) / base * 100)
+
+
+def main(args):
+    database = args.database
+    if database is None:
+        handle, path = tempfile.mkstemp(suffix='.db')
+        os.close(handle)
+        database = 'sqlite:///' + path
+
+    command = [sys.executable] + ['-W' + option for option in sys.warnoptions] + [
+        '-m', 'benchmarks.startup', '--child', '--database', database, '--config', args.config]
+    runs = []
+    try:
+        for _ in range(args.runs):
+            output = subprocess.check_output(command)
+            runs.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+    finally:
+        if args.database is None:
+            os.remove(path)
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results = {}
+    print('{:<16} {:>9} {:>9} {:>9} {:>7}'.format('phase', 'p50 (ms)', 'min (ms)', 'max (ms)', 'p50'))
+    for phase in PHASES:
+        values = [run[phase] for run in runs if phase in run]
+        if not values:
+            continue
+        result = results[phase] = {'p50': median(values), 'min': min(values), 'max': max(values)}
+        print('{:<16} {:>9.1f} {:>9.1f} {:>9.1f} {:>7}'.format(
+            phase, result['p50'], result['min'], result['max'], change(result['p50'], baseline.get(phase, {}).get('p50'))))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'runs': args.runs, 'database': database, 'results': results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--runs', type=int, default=10)
+    arg_parser.add_argument('--database', help='defaults to a temporary SQLite file')
+    arg_parser.add_argument('--config', default='testing')
+    arg_parser.add_argument('--save', help='write the results to this file')
+    arg_parser.add_argument('--baseline', help='compare against results written by --save')
+    arg_parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+    if args.child:
+        child(args)
+    else:
+        main(args)
@@ -0,0 +1,72 @@
+# gunicorn -c gunicorn.conf.py run:app
+import gc
+import glob
+import os
+
+bind = '0.0.0.0:{}'.format(os.environ.get('PORT', '8000'))
+# Each worker has its own database pool (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+
+# /api/v1/stream/ keeps a connection open per client, so workers are gevent
+# by default: each client costs a greenlet, up to worker_connections per
+# worker. A sync worker would be taken by a single client, and killed after
+# `timeout` seconds because it cannot report in while it streams.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+# An async worker reports in while it streams, so this only has to cover a
+# stuck worker; a sync worker must finish every request within it
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120' if worker_class == 'gevent' else '30'))
+
+# The master imports the app and builds it once, and workers are forks of it:
+# a new worker serves right away (python -m benchmarks.startup) and shares
+# the master's memory pages until it writes to them. Code changes need a
+# restart rather than a HUP while it is on.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+if worker_class == 'gevent' and preload_app:
+    # The gevent worker patches the standard library after the fork, too late
+    # for the locks and threads of modules the master already imported
+    from gevent import monkey
+    monkey.patch_all()
+
+# Every worker writes its metrics here and /metrics aggregates them. The
+# variable has to be set before the app imports prometheus_client.
+os.environ.setdefault('prometheus_multiproc_dir', '/tmp/habituate-metrics')
+# With preload_app the metrics are created before on_starting runs
+if not os.path.isdir(os.environ['prometheus_multiproc_dir']):
+    os.makedirs(os.environ['prometheus_multiproc_dir'])
+
+
+def on_starting(server):
+    # Samples left over from a previous run would be added to the new ones
+    path = os.environ['prometheus_multiproc_dir']
+    for name in glob.glob(os.path.join(path, '*.db')):
+        os.remove(name)
+
+
+def child_exit(server, worker):
+    # Drops the live gauges (pool usage) of a worker that is gone
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def pre_fork(server, worker):
+    # Objects the master made so far are left out of garbage collection, so
+    # the collector in the workers does not write to (and copy) their pages.
+    # Python 3.7 and later.
+    if preload_app and hasattr(gc, 'freeze'):
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Lets other greenlets run while psycopg2 waits on the database
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    if preload_app:
+        # Connections the master may have opened must not be shared
+        from app.database import dispose_engines
+        dispose_engines(server.app.wsgi())
@@ -1,16 +1,57 @@
 import os
+import sys
+from datetime import datetime, timedelta
 from flask_script import Manager # class for handling a set of commands
 from flask_migrate import Migrate, MigrateCommand
 from app import db, create_app
 from app import models
+from app import search
+from app.counters import counters
 
 
 app = create_app(config_name=os.getenv('APP_SETTINGS'))
-migrate = Migrate(app, db)
+# The search index is created by create_search_index, not by the migrations
+migrate = Migrate(app, db, include_object=search.include_object)
 manager = Manager(app)
 
 manager.add_command('db', MigrateCommand)
 
 
+@manager.command
+def prune_tombstones(days=90):
+    "Deletes sync tombstones older than DAYS days (match SYNC_TOMBSTONE_DAYS) and expired token revocations"
+    count = models.Tombstone.prune(datetime.utcnow() - timedelta(days=int(days)))
+    print('Deleted {} tombstones'.format(count))
+    count = models.RevokedToken.prune()
+    print('Deleted {} expired token revocations'.format(count))
+
+
+@manager.command
+def create_search_index():
+    "Creates the full-text search index on a database built by db upgrade"
+    with db.engine.begin() as connection:
+        tables = search.create_index(connection)
+    print('Indexed {}'.format(', '.join(tables)) if tables else 'The search index already exists')
+
+
+@manager.command
+def rebuild_counters():
+    "Recomputes the like, attend and favourite counters from their tables"
+    counters.rebuild()
+    print('Counters rebuilt')
+
+
+@manager.command
+def verify_counters():
+    "Lists counters that disagree with their tables; exits with 1 if any do"
+    mismatches = counters.verify()
+    for name, rows in sorted(mismatches.items()):
+        for key, stored, actual in rows:
+            print('{} {}: stored {}, actual {}'.format(name, key, stored, actual))
+    if mismatches:
+        sys.exit(1)
+    print('Counters are correct')
+
+
 if __name__ == '__main__':
     manager.run()
\ No newline at end of file
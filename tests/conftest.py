@@ -0,0 +1,79 @@
+# Run with `python -m pytest` from the repository root. create_app() reads
+# the 'testing' entry of instance/config.py; the database is replaced by an
+# in-memory SQLite one for every test.
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+from app.auth import key_index
+from app.cache import catalog_cache
+from app.versions import table_versions
+from app.models import User, Event, Product, Category, ApiKey
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'SQLALCHEMY_BINDS': None,
+        'REPLICA_DATABASE_URI': None,
+        'SQLALCHEMY_ECHO': False,
+        'METRICS_ENABLED': False,
+        'CATALOG_CACHE_MAX_ENTRIES': 0,
+        'TOKEN_SECRET_KEYS': ['test-signing-key']
+    })
+    # The singletons outlive the app of the previous test
+    key_index.invalidate()
+    catalog_cache.bump()
+    table_versions._expires = 0
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def queries(app):
+    # The SQL statements run on the primary from here on
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(db.engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def admin_key(app):
+    db.session.add(ApiKey('admin-key'))
+    db.session.commit()
+    return 'admin-key'
+
+
+@pytest.fixture
+def data(app):
+    # 3 users, 3 events and 3 products; returns their ids
+    category = Category('Cervejas', 'http://example.com/c.png')
+    db.session.add(category)
+    db.session.flush()
+    users = [User('user{}'.format(n), 'user{}@example.com'.format(n), None, 'key{}'.format(n), date.today())
+             for n in range(3)]
+    events = [Event('event{}'.format(n), 'description', date.today(), None, None, 'event') for n in range(3)]
+    products = [Product('product{}'.format(n), 'description', category.id, None, 'PT', None, True, 1)
+                for n in range(3)]
+    db.session.add_all(users + events + products)
+    db.session.commit()
+    return {
+        'users': [user.id for user in users],
+        'events': [event.id for event in events],
+        'products': [product.id for product in products]
+    }
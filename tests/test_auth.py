@@ -0,0 +1,61 @@
+from app import db
+from app.auth import Principal, key_index
+from app.models import User, ApiKey
+
+
+def test_lookup(data, admin_key):
+    admin_id = ApiKey.query.filter_by(key=admin_key).first().id
+    assert key_index.lookup(admin_key) == Principal('admin', admin_id)
+    assert key_index.lookup('key1') == Principal('user', data['users'][1])
+    assert key_index.lookup('unknown') is None
+    assert key_index.lookup(None) is None
+    assert key_index.lookup('') is None
+
+
+def test_hits_run_no_query(data, queries):
+    assert key_index.lookup('key0') == Principal('user', data['users'][0])
+    assert len(queries) > 0
+
+    del queries[:]
+    for _ in range(3):
+        assert key_index.lookup('key0') == Principal('user', data['users'][0])
+    assert queries == []
+
+    # Unknown keys are not remembered
+    key_index.lookup('unknown')
+    key_index.lookup('unknown')
+    assert len(queries) == 4
+
+
+def test_writes_invalidate(data):
+    assert key_index.lookup('key0') == Principal('user', data['users'][0])
+
+    user = User.query.get(data['users'][0])
+    user.api_key = 'rotated'
+    db.session.commit()
+    assert key_index.lookup('key0') is None
+    assert key_index.lookup('rotated') == Principal('user', data['users'][0])
+
+    assert key_index.lookup('key1') == Principal('user', data['users'][1])
+    User.query.get(data['users'][1]).delete()
+    assert key_index.lookup('key1') is None
+
+
+def test_entries_expire(data, monkeypatch):
+    assert key_index.lookup('key0') == Principal('user', data['users'][0])
+
+    # Another worker's write, which this worker's mapper events do not see
+    db.session.execute(User.__table__.delete().where(User.__table__.c.id == data['users'][0]))
+    db.session.commit()
+    assert key_index.lookup('key0') == Principal('user', data['users'][0])
+
+    # API_KEY_CACHE_TTL later
+    monkeypatch.setattr('app.auth.time.time', lambda: 2 ** 40)
+    assert key_index.lookup('key0') is None
+
+
+def test_require_api_key(client, data, admin_key):
+    assert client.get('/api/v1/users/').status_code == 401
+    assert client.get('/api/v1/users/', headers={'X-Api-Key': 'unknown'}).status_code == 401
+    assert client.get('/api/v1/users/', headers={'X-Api-Key': 'key0'}).status_code == 200
+    assert client.get('/api/v1/users/', headers={'X-Api-Key': admin_key}).status_code == 200
@@ -0,0 +1,67 @@
+import json
+
+from app.models import Like, Attend, Tombstone
+
+
+def post(client, url, items):
+    response = client.post(url, data=json.dumps(items), content_type='application/json',
+                           headers={'X-Api-Key': 'key0'})
+    return response.status_code, json.loads(response.get_data()) if response.status_code == 200 else None
+
+
+def test_results_per_item(client, data):
+    users, events = data['users'], data['events']
+    status, results = post(client, '/api/v1/likes/batch/', [
+        {'user_id': users[0], 'event_id': events[0]},
+        {'user_id': users[0], 'event_id': events[1]},
+        {'user_id': users[1], 'event_id': events[0], 'op': 'remove'}
+    ])
+    assert status == 200
+    assert [result['status'] for result in results] == [201, 201, 404]
+    assert [result['index'] for result in results] == [0, 1, 2]
+    assert results[0]['user_id'] == users[0] and results[0]['event_id'] == events[0]
+
+    status, results = post(client, '/api/v1/likes/batch/', [
+        {'user_id': users[0], 'event_id': events[0]},
+        {'user_id': users[0], 'event_id': events[1], 'op': 'remove'},
+        # Two operations on one row: the last one wins
+        {'user_id': users[2], 'event_id': events[2]},
+        {'user_id': users[2], 'event_id': events[2], 'op': 'remove'},
+        {'user_id': users[2], 'event_id': events[2]}
+    ])
+    assert [result['status'] for result in results] == [200, 200, 409, 409, 201]
+    assert sorted((like.user_id, like.event_id) for like in Like.query) == [(users[0], events[0]),
+                                                                          (users[2], events[2])]
+
+    # The removal is recorded for the delta sync, with its owner
+    tombstones = Tombstone.query.filter_by(table_name='likes').all()
+    assert [tombstone.user_id for tombstone in tombstones] == [users[0]]
+
+
+def test_invalid_items(client, data):
+    users, events = data['users'], data['events']
+    status, results = post(client, '/api/v1/attends/batch/', [
+        'not an object',
+        {'user_id': users[0]},
+        {'user_id': True, 'event_id': events[0], 'will_go': 'going'},
+        {'user_id': 0, 'event_id': events[0], 'will_go': 'going'},
+        {'user_id': users[0], 'event_id': events[0], 'op': 'toggle'},
+        {'user_id': users[0], 'event_id': events[0]},
+        {'user_id': users[0], 'event_id': 999, 'will_go': 'going'},
+        {'user_id': 998, 'event_id': 999, 'will_go': 'going'},
+        {'user_id': users[1], 'event_id': events[1], 'will_go': 'maybe'}
+    ])
+    assert status == 200
+    assert [result['status'] for result in results] == [400, 400, 400, 400, 400, 400, 404, 404, 201]
+    assert results[6]['error'] == 'Not found: event_id 999'
+    assert results[7]['error'] == 'Not found: event_id 999, user_id 998'
+    assert [(attend.user_id, attend.event_id, attend.will_go) for attend in Attend.query] == [
+        (users[1], events[1], 'maybe')]
+
+
+def test_invalid_batches(app, client, data):
+    app.config['BATCH_MAX_ITEMS'] = 2
+    item = {'user_id': data['users'][0], 'product_id': data['products'][0]}
+    assert post(client, '/api/v1/favourites/batch/', [item] * 3)[0] == 400
+    assert post(client, '/api/v1/favourites/batch/', item)[0] == 400
+    assert post(client, '/api/v1/favourites/batch/', [item] * 2)[0] == 200
@@ -0,0 +1,72 @@
+import json
+
+from app import db
+from app.cache import catalog_cache
+from app.models import TableVersion
+from app.versions import table_versions
+
+
+def get(client, url, admin_key):
+    response = client.get(url, headers={'X-Api-Key': admin_key})
+    assert response.status_code == 200
+    return response
+
+
+def test_hits_skip_the_view(client, data, admin_key, queries, monkeypatch):
+    monkeypatch.setattr(catalog_cache, 'max_entries', 256)
+    hits = catalog_cache.hits
+
+    first = get(client, '/api/v1/products/', admin_key)
+    del queries[:]
+    second = get(client, '/api/v1/products/', admin_key)
+    assert catalog_cache.hits == hits + 1
+    assert second.get_data() == first.get_data()
+    assert not [statement for statement in queries if 'FROM products' in statement]
+
+
+def test_writes_bump_the_version(client, data, admin_key, monkeypatch):
+    monkeypatch.setattr(catalog_cache, 'max_entries', 256)
+    product_id = data['products'][0]
+    get(client, '/api/v1/products/', admin_key)
+    version = catalog_cache.version
+
+    response = client.put('/api/v1/products/{}/?country=Spain'.format(product_id), headers={'X-Api-Key': admin_key})
+    assert response.status_code == 200
+    assert catalog_cache.version == version + 1
+    assert catalog_cache.stats()['entries'] == 0
+
+    products = json.loads(get(client, '/api/v1/products/', admin_key).get_data())
+    assert [product['country'] for product in products if product['id'] == product_id] == ['Spain']
+
+
+def test_another_worker_writes(client, data, admin_key, monkeypatch):
+    monkeypatch.setattr(catalog_cache, 'max_entries', 256)
+    get(client, '/api/v1/products/', admin_key)
+    misses = catalog_cache.misses
+
+    # A write through another worker only shows up as a table version change
+    db.session.execute(TableVersion.__table__.insert().values(name='products', version=1))
+    db.session.commit()
+    table_versions._expires = 0
+    get(client, '/api/v1/products/', admin_key)
+    assert catalog_cache.misses == misses + 1
+
+
+def test_entries_are_capped(client, data, admin_key, monkeypatch):
+    monkeypatch.setattr(catalog_cache, 'max_entries', 2)
+    for limit in (1, 2, 3):
+        get(client, '/api/v1/products/?limit={}'.format(limit), admin_key)
+    assert catalog_cache.stats()['entries'] == 2
+
+    # The least recently used entry went first
+    hits, misses = catalog_cache.hits, catalog_cache.misses
+    get(client, '/api/v1/products/?limit=3', admin_key)
+    get(client, '/api/v1/products/?limit=1', admin_key)
+    assert (catalog_cache.hits, catalog_cache.misses) == (hits + 1, misses + 1)
+    assert catalog_cache.stats()['entries'] == 2
+
+
+def test_errors_are_not_cached(client, data, admin_key, monkeypatch):
+    monkeypatch.setattr(catalog_cache, 'max_entries', 256)
+    assert client.get('/api/v1/products/999/', headers={'X-Api-Key': admin_key}).status_code == 404
+    assert catalog_cache.stats()['entries'] == 0
@@ -0,0 +1,79 @@
+import gzip
+import io
+import json
+
+import pytest
+
+import app.compression
+from app.cache import catalog_cache
+from app.compression import compressor
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.setattr(app.compression, 'brotli', None)
+    monkeypatch.setattr(compressor, 'min_size', 64)
+
+
+def get(client, url, key, **headers):
+    headers['X-Api-Key'] = key
+    return client.get(url, headers=headers)
+
+
+def gunzip(body):
+    return gzip.GzipFile(fileobj=io.BytesIO(body)).read()
+
+
+def test_threshold(client, data, admin_key, gzip_only, monkeypatch):
+    url = '/api/v1/products/?limit=3'
+    plain = get(client, url, admin_key)
+    assert 'Content-Encoding' not in plain.headers
+    assert 'Accept-Encoding' in plain.headers['Vary']
+
+    response = get(client, url, admin_key, **{'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gunzip(response.get_data()) == plain.get_data()
+
+    monkeypatch.setattr(compressor, 'min_size', len(plain.get_data()) + 1)
+    response = get(client, url, admin_key, **{'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data() == plain.get_data()
+
+
+def test_streamed_lists(client, data, admin_key, gzip_only):
+    plain = get(client, '/api/v1/users/', admin_key)
+    response = get(client, '/api/v1/users/', admin_key, **{'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert json.loads(gunzip(response.get_data())) == json.loads(plain.get_data())
+
+
+def test_etag_per_encoding(client, data, admin_key, gzip_only):
+    url = '/api/v1/products/?limit=3'
+    etag = get(client, url, admin_key).headers['ETag']
+    response = get(client, url, admin_key, **{'Accept-Encoding': 'gzip'})
+    assert response.headers['ETag'] == etag[:-1] + '-gzip"'
+
+    response = get(client, url, admin_key, **{'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag[:-1] + '-gzip"'
+
+
+def test_cached_variants(client, data, admin_key, gzip_only, monkeypatch):
+    monkeypatch.setattr(catalog_cache, 'max_entries', 256)
+    calls = []
+    compress = compressor._compress
+
+    def counted(*args):
+        calls.append(args[1])
+        return compress(*args)
+    monkeypatch.setattr(compressor, '_compress', counted)
+
+    bodies = [get(client, '/api/v1/products/?limit=3', admin_key, **{'Accept-Encoding': 'gzip'}).get_data()
+              for _ in range(3)]
+    assert calls == ['gzip']
+    assert bodies[0] == bodies[1] == bodies[2]
+    # Clients without gzip get the plain body from the same entry
+    plain = get(client, '/api/v1/products/?limit=3', admin_key)
+    assert gunzip(bodies[0]) == plain.get_data()
+    assert calls == ['gzip']
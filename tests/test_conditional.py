@@ -0,0 +1,51 @@
+def test_not_modified(client, data, queries):
+    headers = {'X-Api-Key': 'key0'}
+    url = '/api/v1/events/{}/'.format(data['events'][0])
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    etag = response.headers['ETag']
+
+    del queries[:]
+    response = client.get(url, headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 304
+    assert response.get_data() == b''
+    assert response.headers['ETag'] == etag
+    # The view did not run
+    assert not [statement for statement in queries if 'FROM events' in statement]
+
+    response = client.get(url, headers=dict(headers, **{'If-None-Match': '"stale"'}))
+    assert response.status_code == 200
+
+
+def test_writes_change_the_etag(client, data, admin_key):
+    headers = {'X-Api-Key': 'key0'}
+    url = '/api/v1/events/{}/'.format(data['events'][1])
+    etag = client.get(url, headers=headers).headers['ETag']
+
+    response = client.put('/api/v1/events/{}/?title=renamed'.format(data['events'][0]),
+                          headers={'X-Api-Key': admin_key})
+    assert response.status_code == 200
+
+    # Any change to the table, not only to this row
+    response = client.get(url, headers=dict(headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_etag_depends_on_the_request(client, data):
+    headers = {'X-Api-Key': 'key0'}
+    url = '/api/v1/events/{}/'.format(data['events'][0])
+    etags = set([
+        client.get(url, headers=headers).headers['ETag'],
+        client.get(url + '?fields=title', headers=headers).headers['ETag'],
+        client.get(url, headers=dict(headers, Accept='application/x-msgpack')).headers['ETag'],
+        client.get('/api/v1/events/{}/'.format(data['events'][1]), headers=headers).headers['ETag']
+    ])
+    assert len(etags) == 4
+
+
+def test_errors_have_no_etag(client, data):
+    response = client.get('/api/v1/events/999/', headers={'X-Api-Key': 'key0'})
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
@@ -0,0 +1,46 @@
+from app import db
+from app.counters import counters
+from app.models import Like, Attend, Favourite
+
+
+def test_moving_onto_an_existing_pair(client, data, admin_key):
+    users, events, products = data['users'], data['events'], data['products']
+    headers = {'X-Api-Key': admin_key}
+    likes = [Like(users[0], events[0]), Like(users[0], events[1])]
+    favourites = [Favourite(users[0], products[0]), Favourite(users[0], products[1])]
+    db.session.add_all(likes + favourites)
+    db.session.commit()
+    like_id, favourite_id = likes[1].id, favourites[1].id
+
+    response = client.put('/api/v1/likes/{}/?event_id={}'.format(like_id, events[0]), headers=headers)
+    assert response.status_code == 409
+    response = client.put('/api/v1/favourites/{}/?product_id={}'.format(favourite_id, products[0]), headers=headers)
+    assert response.status_code == 409
+    assert Like.query.get(like_id).event_id == events[1]
+    assert Favourite.query.get(favourite_id).product_id == products[1]
+    assert counters.verify() == {}
+
+    response = client.put('/api/v1/likes/{}/?event_id={}'.format(like_id, events[2]), headers=headers)
+    assert response.status_code == 200
+    response = client.put('/api/v1/favourites/{}/?product_id={}'.format(favourite_id, products[2]), headers=headers)
+    assert response.status_code == 200
+    assert counters.verify() == {}
+
+
+def test_moving_an_attend_onto_an_existing_pair(client, data, admin_key):
+    users, events = data['users'], data['events']
+    headers = {'X-Api-Key': admin_key}
+    attends = [Attend(users[0], events[0], 'going'), Attend(users[0], events[1], 'maybe')]
+    db.session.add_all(attends)
+    db.session.commit()
+    attend_id = attends[1].id
+
+    response = client.put('/api/v1/attends/{}/?event_id={}'.format(attend_id, events[0]), headers=headers)
+    assert response.status_code == 409
+    assert Attend.query.get(attend_id).event_id == events[1]
+    assert counters.verify() == {}
+
+    response = client.put('/api/v1/attends/{}/?event_id={}&will_go=going'.format(attend_id, events[2]),
+                          headers=headers)
+    assert response.status_code == 200
+    assert counters.verify() == {}
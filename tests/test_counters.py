@@ -0,0 +1,193 @@
+import random
+
+from app import db
+from app.batch import apply_batch
+from app.counters import counters
+from app.models import User, Event, Product, Like, Attend, Favourite, EventAttendCount
+from app.upsert import upsert_many
+
+
+def updated_at(model, ids):
+    table = model.__table__
+    return dict(db.session.execute(
+        table.select().with_only_columns([table.c.id, table.c.updated_at]).where(table.c.id.in_(ids))
+    ).fetchall())
+
+
+def like_counts(ids):
+    db.session.expire_all()
+    return [Event.query.get(event_id).like_count for event_id in ids]
+
+
+def attend_counts():
+    return dict(((row.event_id, row.will_go), row.count) for row in EventAttendCount.query if row.count)
+
+
+def test_orm_insert_update_delete(data):
+    users, events, products = data['users'], data['events'], data['products']
+    before = updated_at(Event, events), updated_at(Product, products)
+
+    likes = [Like(user_id, events[0]) for user_id in users]
+    attends = [Attend(user_id, events[1], 'going') for user_id in users]
+    favourites = [Favourite(users[0], products[0]), Favourite(users[1], products[0]), Favourite(users[2], products[1])]
+    db.session.add_all(likes + attends + favourites)
+    db.session.commit()
+    assert like_counts(events) == [3, 0, 0]
+    assert attend_counts() == {(events[1], 'going'): 3}
+    assert counters.verify() == {}
+
+    # Moving rows between parents and will_go values, after a commit expired them
+    likes[0].event_id = events[2]
+    attends[0].will_go = 'maybe'
+    attends[1].event_id = events[2]
+    favourites[0].product_id = products[2]
+    db.session.commit()
+    assert like_counts(events) == [2, 0, 1]
+    assert attend_counts() == {(events[1], 'going'): 1, (events[1], 'maybe'): 1, (events[2], 'going'): 1}
+    assert counters.verify() == {}
+
+    db.session.delete(likes[1])
+    db.session.delete(attends[2])
+    db.session.delete(favourites[1])
+    db.session.commit()
+    assert like_counts(events) == [1, 0, 1]
+    assert [Product.query.get(product_id).favourite_count for product_id in products] == [0, 1, 1]
+    assert counters.verify() == {}
+
+    # A like is not a change to the event as far as the delta sync is concerned
+    assert (updated_at(Event, events), updated_at(Product, products)) == before
+
+
+def test_cascading_deletes(data):
+    users, events, products = data['users'], data['events'], data['products']
+    db.session.add_all([Like(user_id, event_id) for user_id in users for event_id in events])
+    db.session.add_all([Attend(user_id, events[0], 'going') for user_id in users])
+    db.session.add_all([Favourite(user_id, products[0]) for user_id in users])
+    db.session.commit()
+
+    Event.query.get(events[1]).delete()
+    User.query.get(users[0]).delete()
+    assert like_counts([events[0], events[2]]) == [2, 2]
+    assert attend_counts() == {(events[0], 'going'): 2}
+    assert counters.verify() == {}
+
+
+def test_upsert_many(data):
+    users, events, products = data['users'], data['events'], data['products']
+    before = updated_at(Event, events)
+
+    upsert_many(Like, [{'user_id': user_id, 'event_id': events[0]} for user_id in users], ('user_id', 'event_id'))
+    # The same rows again, plus a new one: only the new one counts
+    upsert_many(Like, [{'user_id': user_id, 'event_id': events[0]} for user_id in users] +
+                [{'user_id': users[0], 'event_id': events[1]}], ('user_id', 'event_id'))
+    upsert_many(Favourite, [{'user_id': users[0], 'product_id': product_id} for product_id in products],
+                ('user_id', 'product_id'))
+
+    rows = [{'user_id': user_id, 'event_id': events[2], 'will_go': 'going'} for user_id in users]
+    upsert_many(Attend, rows, ('user_id', 'event_id'), update=('will_go',))
+    # An upsert that changes the counted column of existing rows
+    rows[0]['will_go'] = 'maybe'
+    upsert_many(Attend, rows, ('user_id', 'event_id'), update=('will_go',))
+    db.session.commit()
+
+    assert like_counts(events) == [3, 1, 0]
+    assert attend_counts() == {(events[2], 'going'): 2, (events[2], 'maybe'): 1}
+    assert counters.verify() == {}
+    assert updated_at(Event, events) == before
+
+
+def test_apply_batch(data):
+    users, events, products = data['users'], data['events'], data['products']
+    before = updated_at(Product, products)
+
+    apply_batch(Favourite, [{'user_id': user_id, 'product_id': product_id}
+                            for user_id in users for product_id in products], ('user_id', 'product_id'))
+    results = apply_batch(Favourite, [
+        {'user_id': users[0], 'product_id': products[0], 'op': 'remove'},
+        {'user_id': users[1], 'product_id': products[0], 'op': 'remove'},
+        # Removing a row twice only counts once
+        {'user_id': users[1], 'product_id': products[0], 'op': 'remove'},
+        {'user_id': users[2], 'product_id': 999, 'op': 'remove'}
+    ], ('user_id', 'product_id'))
+    assert [result['status'] for result in results] == [200, 409, 200, 404]
+
+    apply_batch(Attend, [{'user_id': user_id, 'event_id': events[0], 'will_go': 'going'} for user_id in users],
+                ('user_id', 'event_id'), ('will_go',))
+    apply_batch(Attend, [
+        {'user_id': users[0], 'event_id': events[0], 'will_go': 'maybe'},
+        {'user_id': users[1], 'event_id': events[0], 'op': 'remove'}
+    ], ('user_id', 'event_id'), ('will_go',))
+    db.session.commit()
+
+    db.session.expire_all()
+    assert [Product.query.get(product_id).favourite_count for product_id in products] == [1, 3, 3]
+    assert attend_counts() == {(events[0], 'going'): 1, (events[0], 'maybe'): 1}
+    assert counters.verify() == {}
+    assert updated_at(Product, products) == before
+
+
+def test_mixed_writes(data):
+    # Random likes, attends and favourites through every write path
+    users, events, products = data['users'], data['events'], data['products']
+    rng = random.Random(0)
+    will_go = ['going', 'maybe', 'not_going']
+
+    for _ in range(400):
+        user_id = rng.choice(users)
+        event_id = rng.choice(events)
+        product_id = rng.choice(products)
+        path = rng.choice(['orm', 'upsert', 'batch'])
+        remove = rng.random() < 0.3
+
+        if path == 'orm':
+            like = Like.query.filter_by(user_id=user_id, event_id=event_id).first()
+            attend = Attend.query.filter_by(user_id=user_id, event_id=event_id).first()
+            favourite = Favourite.query.filter_by(user_id=user_id, product_id=product_id).first()
+            if remove:
+                for row in (like, attend, favourite):
+                    if row is not None:
+                        db.session.delete(row)
+            else:
+                if like is None:
+                    db.session.add(Like(user_id, event_id))
+                if attend is None:
+                    db.session.add(Attend(user_id, event_id, rng.choice(will_go)))
+                else:
+                    attend.will_go = rng.choice(will_go)
+                if favourite is None:
+                    db.session.add(Favourite(user_id, product_id))
+        elif path == 'upsert' and not remove:
+            upsert_many(Like, [{'user_id': user_id, 'event_id': event_id}], ('user_id', 'event_id'))
+            upsert_many(Attend, [{'user_id': user_id, 'event_id': event_id, 'will_go': rng.choice(will_go)}],
+                        ('user_id', 'event_id'), update=('will_go',))
+            upsert_many(Favourite, [{'user_id': user_id, 'product_id': product_id}], ('user_id', 'product_id'))
+        else:
+            op = 'remove' if remove else 'add'
+            apply_batch(Like, [{'user_id': user_id, 'event_id': event_id, 'op': op}], ('user_id', 'event_id'))
+            apply_batch(Attend, [{'user_id': user_id, 'event_id': event_id, 'will_go': rng.choice(will_go), 'op': op}],
+                        ('user_id', 'event_id'), ('will_go',))
+            apply_batch(Favourite, [{'user_id': user_id, 'product_id': product_id, 'op': op}],
+                        ('user_id', 'product_id'))
+        db.session.commit()
+
+    assert counters.verify() == {}
+
+
+def test_rebuild(data):
+    users, events = data['users'], data['events']
+    db.session.add_all([Like(user_id, events[0]) for user_id in users])
+    db.session.add(Attend(users[0], events[0], 'going'))
+    db.session.commit()
+
+    # Counters knocked out of step behind the app's back
+    events_table = Event.__table__
+    db.session.execute(events_table.update().values(like_count=7))
+    db.session.execute(EventAttendCount.__table__.delete())
+    db.session.commit()
+    mismatches = counters.verify()
+    assert set(mismatches) == {'events.like_count', 'event_attend_counts'}
+    assert ((events[0],), 7, 3) in mismatches['events.like_count']
+
+    counters.rebuild()
+    assert counters.verify() == {}
+    assert like_counts(events) == [3, 0, 0]
@@ -0,0 +1,63 @@
+from datetime import date
+from decimal import Decimal
+import json
+
+import pytest
+
+from app.encoding import buffered, encoder
+
+
+def get(client, url, accept=None):
+    headers = {'X-Api-Key': 'key0'}
+    if accept:
+        headers['Accept'] = accept
+    return client.get(url, headers=headers)
+
+
+def test_json_by_default(client, data):
+    for accept in (None, 'application/json', 'application/xml', 'text/html'):
+        response = get(client, '/api/v1/users/', accept)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/json'
+        assert 'Accept' in response.headers['Vary']
+        assert [user['id'] for user in json.loads(response.get_data())] == data['users']
+
+
+def test_columnar(client, data):
+    accept = 'application/vnd.habituate.columnar+json'
+    # Streamed, paginated and empty lists
+    for url in ('/api/v1/users/', '/api/v1/users/?limit=2', '/api/v1/users/?cursor=999'):
+        response = get(client, url, accept)
+        assert response.mimetype == accept
+        expected = json.loads(get(client, url).get_data())
+        body = json.loads(response.get_data())
+        assert [dict(zip(body['columns'], row)) for row in body['rows']] == expected
+
+    # Anything other than a list is plain JSON
+    response = get(client, '/api/v1/users/{}/'.format(data['users'][0]), accept)
+    assert json.loads(response.get_data())['id'] == data['users'][0]
+
+
+def test_msgpack(client, data):
+    msgpack = pytest.importorskip('msgpack')
+    for url in ('/api/v1/users/', '/api/v1/users/?limit=2', '/api/v1/events/{}/'.format(data['events'][0])):
+        response = get(client, url, 'application/x-msgpack')
+        assert response.mimetype == 'application/x-msgpack'
+        assert msgpack.unpackb(response.get_data(), raw=False) == json.loads(get(client, url).get_data())
+
+
+def test_backends_agree(monkeypatch):
+    pytest.importorskip('orjson')
+    value = {'price': Decimal('2.50'), 'date': date(2019, 5, 1), 'name': u'Cerveja \xe9', 'ids': [1, 2]}
+    monkeypatch.setattr(encoder, 'backend', 'json')
+    stdlib = encoder.dumps(value)
+    monkeypatch.setattr(encoder, 'backend', 'orjson')
+    assert json.loads(encoder.dumps(value)) == json.loads(stdlib)
+
+
+def test_buffered():
+    items = [encoder.dumps(n) for n in range(100)]
+    chunks = list(buffered(b'[', items, b']', chunk_size=32))
+    assert len(chunks) > 1
+    assert json.loads(b''.join(chunks).decode('utf-8')) == list(range(100))
+    assert list(buffered(b'[', [], b']')) == [b'[]']
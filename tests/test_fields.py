@@ -0,0 +1,33 @@
+import json
+
+
+def get(client, url, key='key0'):
+    response = client.get(url, headers={'X-Api-Key': key})
+    return response.status_code, json.loads(response.get_data()) if response.status_code == 200 else None
+
+
+def test_only_the_requested_columns(client, data, admin_key, queries):
+    status, products = get(client, '/api/v1/products/?fields=name,%20price,,', admin_key)
+    assert status == 200
+    assert [sorted(product) for product in products] == [['id', 'name', 'price']] * 3
+
+    selects = [statement for statement in queries if 'FROM products' in statement]
+    assert selects
+    assert all('products.description' not in statement for statement in selects)
+
+    status, event = get(client, '/api/v1/events/{}/?fields=title'.format(data['events'][0]))
+    assert status == 200
+    assert event == {'id': data['events'][0], 'title': 'event0'}
+
+
+def test_unknown_fields(client, data, admin_key):
+    assert get(client, '/api/v1/products/?fields=name,colour', admin_key)[0] == 400
+    assert get(client, '/api/v1/events/{}/?fields=secret'.format(data['events'][0]))[0] == 400
+    # Users never see each other's keys
+    assert get(client, '/api/v1/users/{}/?fields=api_key'.format(data['users'][1]))[0] == 400
+
+
+def test_every_field_by_default(client, data):
+    status, user = get(client, '/api/v1/users/{}/'.format(data['users'][1]))
+    assert status == 200
+    assert sorted(user) == ['email', 'id', 'name', 'profile_pic', 'start_date']
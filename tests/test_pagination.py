@@ -0,0 +1,67 @@
+import json
+from datetime import date
+
+from app import db
+from app.models import User
+from app.pagination import list_response
+from app.serializers import USER_FIELDS
+
+
+def add_users(count):
+    db.session.add_all([User('more{}'.format(n), 'more{}@example.com'.format(n), None, 'more-key{}'.format(n), date.today())
+                        for n in range(count)])
+    db.session.commit()
+    return [user.id for user in User.query.order_by(User.id)]
+
+
+def test_pages_follow_the_cursor(client, data):
+    ids = add_users(22)
+    headers = {'X-Api-Key': 'key0'}
+
+    seen = []
+    url = '/api/v1/users/?limit=10'
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        page = json.loads(response.get_data())
+        assert len(page) <= 10
+        seen.extend(row['id'] for row in page)
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            url = None
+        else:
+            assert cursor == str(page[-1]['id'])
+            assert 'cursor={}'.format(cursor) in response.headers['Link']
+            url = '/api/v1/users/?limit=10&cursor={}'.format(cursor)
+    assert seen == ids
+
+    response = client.get('/api/v1/users/?limit=10&cursor={}'.format(ids[-1]), headers=headers)
+    assert json.loads(response.get_data()) == []
+    assert 'X-Next-Cursor' not in response.headers
+
+
+def test_limit_is_capped(app, client, data):
+    add_users(10)
+    app.config['PAGINATION_MAX_LIMIT'] = 4
+    response = client.get('/api/v1/users/?limit=1000', headers={'X-Api-Key': 'key0'})
+    assert len(json.loads(response.get_data())) == 4
+    response = client.get('/api/v1/users/?limit=0', headers={'X-Api-Key': 'key0'})
+    assert len(json.loads(response.get_data())) == 1
+
+
+def test_without_a_limit_the_list_is_streamed(app, client, data):
+    ids = add_users(7)
+    app.config['PAGINATION_YIELD_PER'] = 2
+
+    for url, streamed in (('/api/v1/users/', True), ('/api/v1/users/?limit=5', False)):
+        with app.test_request_context(url):
+            response = list_response(USER_FIELDS.select(User.query), User.id, USER_FIELDS.dump)
+            assert response.is_streamed == streamed
+
+    response = client.get('/api/v1/users/', headers={'X-Api-Key': 'key0'})
+    assert response.status_code == 200
+    assert 'X-Next-Cursor' not in response.headers
+    assert [row['id'] for row in json.loads(response.get_data())] == ids
+
+    response = client.get('/api/v1/users/?cursor={}'.format(ids[4]), headers={'X-Api-Key': 'key0'})
+    assert [row['id'] for row in json.loads(response.get_data())] == ids[5:]
@@ -0,0 +1,96 @@
+# Two SQLite files stand in for the primary and its replica; the replica
+# gets different rows, so each response shows where it was read from.
+from datetime import date
+import json
+import time
+
+import pytest
+
+from app import create_app, db
+from app.auth import key_index
+from app.models import User
+from app.routing import router
+from app.versions import table_versions
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app('testing', {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///{}'.format(tmp_path / 'primary.db'),
+        'SQLALCHEMY_BINDS': None,
+        'REPLICA_DATABASE_URI': 'sqlite:///{}'.format(tmp_path / 'replica.db'),
+        'SQLALCHEMY_ECHO': False,
+        'METRICS_ENABLED': False,
+        'CATALOG_CACHE_MAX_ENTRIES': 0,
+        'TOKEN_SECRET_KEYS': ['test-signing-key']
+    })
+    key_index.invalidate()
+    table_versions._expires = 0
+    router._writers = {}
+    router._checked = 0
+    with app.app_context():
+        db.create_all()
+        replica = db.get_engine(app, bind='replica')
+        db.metadata.create_all(bind=replica)
+        replica.execute(User.__table__.insert().values(
+            name='replica', email='replica@example.com', api_key='replica-key', start_date=date.today()))
+        yield app
+        db.session.remove()
+    # The other tests run without a replica
+    router.uri = None
+
+
+def names(response):
+    assert response.status_code == 200
+    return [user['name'] for user in json.loads(response.get_data())]
+
+
+def test_reads_go_to_the_replica(app, client, data):
+    headers = {'X-Api-Key': 'key0'}
+    # Keys are always checked on the primary, which has them
+    assert names(client.get('/api/v1/users/', headers=headers)) == ['replica']
+    assert names(client.get('/api/v1/users/?limit=10', headers=headers)) == ['replica']
+    with app.test_request_context('/api/v1/users/', method='POST'):
+        assert not router.use_replica(db.session())
+
+
+def test_writers_read_their_writes(app, data):
+    writer, other = app.test_client(), app.test_client()
+    response = writer.post('/api/v1/likes/?user_id={}&event_id={}'.format(data['users'][0], data['events'][0]),
+                           headers={'X-Api-Key': 'key0'})
+    assert response.status_code == 201
+    assert router.COOKIE in response.headers['Set-Cookie']
+
+    # The principal and, for other workers, the cookie
+    assert names(writer.get('/api/v1/users/', headers={'X-Api-Key': 'key0'})) == ['user0', 'user1', 'user2']
+    fresh = app.test_client()
+    assert names(fresh.get('/api/v1/users/', headers={'X-Api-Key': 'key0'})) == ['user0', 'user1', 'user2']
+    assert names(other.get('/api/v1/users/', headers={'X-Api-Key': 'key1'})) == ['replica']
+
+
+def test_stickiness_expires(app, data, monkeypatch):
+    client = app.test_client()
+    client.post('/api/v1/likes/?user_id={}&event_id={}'.format(data['users'][0], data['events'][0]),
+                headers={'X-Api-Key': 'key0'})
+    assert names(client.get('/api/v1/users/', headers={'X-Api-Key': 'key0'})) == ['user0', 'user1', 'user2']
+
+    # The same client, still sending its cookie, once the window has passed
+    now = time.time()
+    monkeypatch.setattr('app.routing.time.time', lambda: now + router.sticky_seconds + 1)
+    assert names(client.get('/api/v1/users/', headers={'X-Api-Key': 'key0'})) == ['replica']
+
+
+def test_unavailable_replica(app, client, data, monkeypatch):
+    headers = {'X-Api-Key': 'key0'}
+    assert names(client.get('/api/v1/users/', headers=headers)) == ['replica']
+
+    monkeypatch.setattr(router, '_check', lambda app: False)
+    router._checked = 0
+    assert names(client.get('/api/v1/users/', headers=headers)) == ['user0', 'user1', 'user2']
+
+    # A connection error takes it out until the next check
+    monkeypatch.undo()
+    router._on_error(None)
+    assert names(client.get('/api/v1/users/', headers=headers)) == ['user0', 'user1', 'user2']
+    router._checked = 0
+    assert names(client.get('/api/v1/users/', headers=headers)) == ['replica']
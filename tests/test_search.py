@@ -0,0 +1,61 @@
+import json
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from app import db
+from app.models import Product
+from app.search import SEARCHABLE, create_index, include_object, search
+import app.views.search as views
+
+
+def test_index_follows_the_text_columns(data):
+    products = data['products']
+    assert [match[1] for match in search('product0', ['products'])] == [products[0]]
+
+    product = Product.query.get(products[0])
+    product.name = 'cervejaria'
+    db.session.commit()
+    assert search('product0', ['products']) == []
+    assert [match[1] for match in search('cerv', ['products'])] == [products[0]]
+
+    # Counter writes do not touch the index
+    db.session.execute(Product.__table__.update().values(favourite_count=5))
+    db.session.commit()
+    assert [match[1] for match in search('cerv', ['products'])] == [products[0]]
+
+
+def test_unsupported_database(client, data, admin_key, monkeypatch):
+    def unsupported(*args, **kwargs):
+        raise NotImplementedError('Search needs Postgres or SQLite, not mysql')
+    monkeypatch.setattr(views, 'search', unsupported)
+
+    response = client.get('/api/v1/search/?q=cerv', headers={'X-Api-Key': admin_key})
+    assert response.status_code == 501
+
+    monkeypatch.undo()
+    response = client.get('/api/v1/search/?q=product1', headers={'X-Api-Key': admin_key})
+    assert response.status_code == 200
+    assert [row['id'] for row in json.loads(response.get_data())] == [data['products'][1]]
+
+
+def test_migrations_leave_the_index_alone(app):
+    # What manage.py db migrate would generate after db.create_all()
+    context = MigrationContext.configure(db.session.connection(), opts={'include_object': include_object})
+    assert compare_metadata(context, db.metadata) == []
+
+
+def test_create_index(data):
+    # A database built by the migrations has the tables but no index
+    for model, _ in SEARCHABLE.values():
+        for trigger in ('insert', 'delete', 'update'):
+            db.session.execute('DROP TRIGGER {}_fts_{}'.format(model.__tablename__, trigger))
+        db.session.execute('DROP TABLE {}_fts'.format(model.__tablename__))
+    db.session.commit()
+
+    connection = db.session.connection()
+    assert create_index(connection) == ['products', 'events']
+    assert create_index(connection) == []
+    db.session.commit()
+    assert [match[1] for match in search('product2', ['products'])] == [data['products'][2]]
+    assert [match[1] for match in search('event1', ['events'])] == [data['events'][1]]
@@ -0,0 +1,99 @@
+from collections import deque
+import json
+
+import pytest
+
+from app import db
+from app.auth import Principal, token_signer
+from app.models import Event, Product
+from app.stream import broker
+
+
+@pytest.fixture
+def history(monkeypatch):
+    monkeypatch.setattr(broker, '_history', deque(maxlen=100))
+    monkeypatch.setattr(broker, '_subscribers', set())
+    return broker._history
+
+
+def published(history):
+    return [(message['event'], message['data']) for message in history]
+
+
+def test_published_on_commit(data, history):
+    event = Event('new', 'description', None, None, None, 'news')
+    db.session.add(event)
+    db.session.flush()
+    assert published(history) == []
+    db.session.commit()
+    assert published(history) == [('event.created', {'id': event.id, 'event_type': 'news'})]
+
+    product = Product.query.get(data['products'][0])
+    product.country = 'Spain'
+    db.session.commit()
+    db.session.delete(event)
+    db.session.commit()
+    assert published(history)[1:] == [
+        ('catalog.updated', {'table': 'products', 'id': product.id, 'action': 'updated'}),
+        ('event.deleted', {'id': event.id, 'event_type': 'news'})
+    ]
+
+
+def test_nothing_on_rollback(data, history):
+    db.session.add(Event('new', 'description', None, None, None, 'news'))
+    db.session.flush()
+    db.session.rollback()
+    # Neither now nor with the next transaction
+    Product.query.get(data['products'][0]).country = 'Spain'
+    db.session.commit()
+    assert [name for name, _ in published(history)] == ['catalog.updated']
+
+
+def test_backlog_and_reset(history, monkeypatch):
+    monkeypatch.setattr(broker, 'heartbeat', 0.01)
+    for n in range(3):
+        broker.publish('catalog.updated', {'id': n})
+    ids = [message['id'] for message in history]
+
+    stream = broker.stream(ids[0])
+    assert next(stream) == 'retry: 5000\n\n'
+    assert [json.loads(next(stream).split('data: ')[1])['id'] for _ in range(2)] == [1, 2]
+    broker.publish('event.created', {'id': 9})
+    assert next(stream).startswith('id: {}\nevent: event.created\n'.format(history[-1]['id']))
+    stream.close()
+
+    # Too old an id
+    stream = broker.stream('gone')
+    next(stream)
+    assert next(stream) == 'event: reset\ndata: {}\n\n'
+    stream.close()
+
+
+def test_slow_clients_are_dropped(history, monkeypatch):
+    monkeypatch.setattr(broker, 'heartbeat', 0.01)
+    monkeypatch.setattr(broker, 'queue_size', 1)
+    stream = broker.stream()
+    next(stream)
+    broker.publish('catalog.updated', {'id': 1})
+    broker.publish('catalog.updated', {'id': 2})
+    assert json.loads(next(stream).split('data: ')[1]) == {'id': 1}
+    assert next(stream) == 'event: reset\ndata: {}\n\n'
+    assert list(stream) == []
+
+
+def test_stream_tokens(client, data, history):
+    response = client.post('/api/v1/stream/tokens/', headers={'X-Api-Key': 'key0'})
+    assert response.status_code == 201
+    token = json.loads(response.get_data())['token']
+
+    response = client.get('/api/v1/stream/?token=' + token, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    response.close()
+
+    # Neither the key nor an access token goes in the URL, and a stream
+    # token opens nothing else
+    access = token_signer.issue(Principal('user', data['users'][0]))
+    assert client.get('/api/v1/stream/?api_key=key0').status_code == 401
+    assert client.get('/api/v1/stream/?token=' + access).status_code == 401
+    assert client.get('/api/v1/users/', headers={'Authorization': 'Bearer ' + token}).status_code == 401
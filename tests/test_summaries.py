@@ -0,0 +1,64 @@
+import json
+
+from app import db
+from app.models import Like, Attend
+
+
+def get(client, url):
+    response = client.get(url, headers={'X-Api-Key': 'key0'})
+    return response.status_code, json.loads(response.get_data()) if response.status_code == 200 else None
+
+
+def attend(data):
+    users, events = data['users'], data['events']
+    db.session.add_all([Like(user_id, events[0]) for user_id in users] + [Like(users[0], events[1])])
+    db.session.add_all([Attend(users[0], events[0], 'going'), Attend(users[1], events[0], 'going'),
+                        Attend(users[2], events[0], 'maybe'), Attend(users[0], events[1], 'not_going')])
+    db.session.commit()
+
+
+def test_summary(client, data, queries):
+    attend(data)
+    events = data['events']
+
+    del queries[:]
+    status, summary = get(client, '/api/v1/events/{}/summary/'.format(events[0]))
+    assert status == 200
+    assert summary == {'event_id': events[0], 'likes': 3, 'attends': {'going': 2, 'maybe': 1}}
+    # Only counters are read
+    assert len([statement for statement in queries if 'FROM attends' in statement]) == 0
+
+    status, summary = get(client, '/api/v1/events/{}/summary/'.format(events[2]))
+    assert summary == {'event_id': events[2], 'likes': 0, 'attends': {}}
+    assert get(client, '/api/v1/events/999/summary/')[0] == 404
+
+
+def test_preview(app, client, data):
+    attend(data)
+    users, events = data['users'], data['events']
+    status, summary = get(client, '/api/v1/events/{}/summary/?preview=1'.format(events[0]))
+    assert summary['preview'] == {
+        'going': [{'id': users[0], 'name': 'user0', 'profile_pic': None}],
+        'maybe': [{'id': users[2], 'name': 'user2', 'profile_pic': None}]
+    }
+
+    app.config['EVENT_SUMMARY_MAX_PREVIEW'] = 1
+    status, summary = get(client, '/api/v1/events/{}/summary/?preview=10'.format(events[0]))
+    assert len(summary['preview']['going']) == 1
+
+
+def test_many_events(app, client, data):
+    attend(data)
+    events = data['events']
+    status, summaries = get(client, '/api/v1/events/summary/?ids={},999,{},{}'.format(events[1], events[0], events[1]))
+    assert status == 200
+    # In the order asked, once each, without the missing ones
+    assert [(summary['event_id'], summary['likes'], summary['attends']) for summary in summaries] == [
+        (events[1], 1, {'not_going': 1}),
+        (events[0], 3, {'going': 2, 'maybe': 1})
+    ]
+
+    app.config['EVENT_SUMMARY_MAX_IDS'] = 2
+    assert get(client, '/api/v1/events/summary/?ids=1,2,3')[0] == 400
+    assert get(client, '/api/v1/events/summary/?ids=1,x')[0] == 400
+    assert get(client, '/api/v1/events/summary/')[0] == 400
@@ -0,0 +1,74 @@
+from datetime import datetime, timedelta
+import json
+
+from app import db
+from app.models import Product, Event, Category, Like, Favourite
+
+
+def sync(client, key, query=''):
+    response = client.get('/api/v1/sync/' + query, headers={'X-Api-Key': key})
+    return response.status_code, json.loads(response.get_data()) if response.status_code == 200 else None
+
+
+def age(*models):
+    # Everything written so far was written two days ago
+    for model in models:
+        db.session.execute(model.__table__.update().values(updated_at=datetime.utcnow() - timedelta(days=2)))
+    db.session.commit()
+
+
+def test_full_sync(client, data, admin_key):
+    users, products = data['users'], data['products']
+    db.session.add_all([Favourite(users[0], products[0]), Favourite(users[1], products[1])])
+    db.session.commit()
+
+    status, result = sync(client, 'key0')
+    assert status == 200
+    assert result['full']
+    assert sorted(result['changes']) == ['categories', 'events', 'favourites', 'products']
+    # Users only get their own favourites
+    assert [row['product_id'] for row in result['changes']['favourites']] == [products[0]]
+
+    status, result = sync(client, admin_key, '?entities=favourites')
+    assert list(result['changes']) == ['favourites']
+    assert len(result['changes']['favourites']) == 2
+
+
+def test_changes_since(app, client, data, admin_key):
+    users, events = data['users'], data['events']
+    likes = [Like(users[0], events[0]), Like(users[1], events[0]), Like(users[0], events[1])]
+    db.session.add_all(likes)
+    db.session.commit()
+    age(Product, Event, Category, Like)
+    since = (datetime.utcnow() - timedelta(days=1)).isoformat()
+
+    status, result = sync(client, 'key0', '?entities=products,events,likes&since=' + since)
+    assert status == 200
+    assert not result['full']
+    assert result['changes'] == {} and result['deleted'] == {}
+
+    client.put('/api/v1/products/{}/?country=Spain'.format(data['products'][1]), headers={'X-Api-Key': admin_key})
+    db.session.delete(likes[0])
+    db.session.delete(likes[1])
+    db.session.commit()
+
+    status, result = sync(client, 'key0', '?entities=products,events,likes&since=' + since)
+    assert [row['id'] for row in result['changes']['products']] == [data['products'][1]]
+    assert 'events' not in result['changes']
+    # Only this user's deletions
+    assert result['deleted'] == {'likes': [likes[0].id]}
+
+    status, result = sync(client, admin_key, '?entities=likes&since=' + since)
+    assert sorted(result['deleted']['likes']) == sorted([likes[0].id, likes[1].id])
+
+    # "until" is the next "since", as seconds since the epoch
+    status, result = sync(client, 'key0', '?entities=likes&since={}'.format(result['until']))
+    assert status == 200 and not result['full']
+
+
+def test_old_or_invalid_since(app, client, data):
+    app.config['SYNC_TOMBSTONE_DAYS'] = 30
+    since = (datetime.utcnow() - timedelta(days=31)).isoformat()
+    assert sync(client, 'key0', '?since=' + since)[1]['full']
+    assert sync(client, 'key0', '?since=yesterday-ish')[0] == 400
+    assert sync(client, 'key0', '?entities=users')[0] == 400
@@ -0,0 +1,66 @@
+import json
+
+from app.auth import Principal, token_signer
+
+
+def issue(client, headers):
+    response = client.post('/api/v1/tokens/', headers=headers)
+    return response.status_code, json.loads(response.get_data()).get('token') if response.status_code == 201 else None
+
+
+def test_verify_round_trip(app):
+    token = token_signer.issue(Principal('user', 7))
+    assert token_signer.verify(token) == Principal('user', 7)
+    assert token_signer.verify(token + 'x') is None
+    assert token_signer.verify('not a token') is None
+
+
+def test_expired_token(app, monkeypatch):
+    token = token_signer.issue(Principal('user', 7))
+    monkeypatch.setattr(token_signer, 'max_age', -1)
+    assert token_signer.verify(token) is None
+
+
+def test_key_rotation(app):
+    token = token_signer.issue(Principal('user', 7))
+    app.config['TOKEN_SECRET_KEYS'] = ['new-signing-key', 'test-signing-key']
+    token_signer.init_app(app)
+    assert token_signer.verify(token) == Principal('user', 7)
+    assert token_signer.claims(token_signer.issue(Principal('user', 7)))['sub'] == 7
+
+    app.config['TOKEN_SECRET_KEYS'] = ['new-signing-key']
+    token_signer.init_app(app)
+    assert token_signer.verify(token) is None
+
+
+def test_revoke(app):
+    token = token_signer.issue(Principal('user', 7))
+    assert token_signer.revoke(token)['sub'] == 7
+    assert token_signer.verify(token) is None
+    # Other workers see it once they reload the list
+    token_signer.revoked._expires = 0
+    assert token_signer.verify(token) is None
+
+
+def test_tokens_are_only_issued_for_an_api_key(client, data, admin_key):
+    status, token = issue(client, {'X-Api-Key': 'key0'})
+    assert status == 201
+    assert client.get('/api/v1/users/{}/'.format(data['users'][0]),
+                      headers={'Authorization': 'Bearer ' + token}).status_code == 200
+
+    # A token cannot buy a new one, so it cannot outlive its expiry
+    status, _ = issue(client, {'Authorization': 'Bearer ' + token})
+    assert status == 401
+
+
+def test_revoke_endpoint(client, data, admin_key):
+    _, token = issue(client, {'X-Api-Key': 'key0'})
+    _, other = issue(client, {'X-Api-Key': 'key1'})
+    bearer = {'Authorization': 'Bearer ' + token}
+
+    # Users may only revoke their own tokens
+    assert client.delete('/api/v1/tokens/?token=' + other, headers=bearer).status_code == 403
+    assert client.delete('/api/v1/tokens/?token=' + token, headers=bearer).status_code == 200
+    assert client.get('/api/v1/users/', headers=bearer).status_code == 401
+
+    assert client.delete('/api/v1/tokens/?token=' + other, headers={'X-Api-Key': admin_key}).status_code == 200
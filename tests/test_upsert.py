@@ -0,0 +1,52 @@
+from app import db
+from app.models import Like, Attend
+from app.upsert import upsert, upsert_many
+
+
+def test_upsert_inserts_then_finds(data):
+    users, events = data['users'], data['events']
+
+    like, inserted = upsert(Like, {'user_id': users[0], 'event_id': events[0]}, ('user_id', 'event_id'))
+    assert inserted
+    again, inserted = upsert(Like, {'user_id': users[0], 'event_id': events[0]}, ('user_id', 'event_id'))
+    assert not inserted
+    assert again.id == like.id
+    assert Like.query.count() == 1
+
+
+def test_upsert_updates_only_the_given_columns(data):
+    users, events = data['users'], data['events']
+
+    attend, _ = upsert(Attend, {'user_id': users[0], 'event_id': events[0], 'will_go': 'going'},
+                       ('user_id', 'event_id'), update=('will_go',))
+    attend, inserted = upsert(Attend, {'user_id': users[0], 'event_id': events[0], 'will_go': 'maybe'},
+                              ('user_id', 'event_id'), update=('will_go',))
+    assert not inserted
+    assert attend.will_go == 'maybe'
+
+    # Without `update` an existing row is returned as it is
+    attend, inserted = upsert(Attend, {'user_id': users[0], 'event_id': events[0], 'will_go': 'going'},
+                              ('user_id', 'event_id'))
+    assert not inserted
+    assert attend.will_go == 'maybe'
+
+
+def test_upsert_many_keeps_the_order(data):
+    users, events = data['users'], data['events']
+    upsert_many(Like, [{'user_id': users[1], 'event_id': events[1]}], ('user_id', 'event_id'))
+
+    rows = [{'user_id': users[0], 'event_id': events[0]},
+            {'user_id': users[1], 'event_id': events[1]},
+            {'user_id': users[2], 'event_id': events[2]}]
+    results = upsert_many(Like, rows, ('user_id', 'event_id'))
+    assert [inserted for _, inserted in results] == [True, False, True]
+    assert [(row['user_id'], row['event_id']) for row, _ in results] == [(users[0], events[0]),
+                                                                        (users[1], events[1]),
+                                                                        (users[2], events[2])]
+
+
+def test_upsert_does_not_commit(data):
+    users, events = data['users'], data['events']
+    upsert(Like, {'user_id': users[0], 'event_id': events[0]}, ('user_id', 'event_id'))
+    db.session.rollback()
+    assert Like.query.count() == 0